@@ -0,0 +1,178 @@
+import array
+import hashlib
+import json
+import os
+import sys
+
+from disassembler import Disassembler
+
+PROGRAM_SIZE = 4096
+
+#bump when the analysis changes so stale cache files are not reused
+VERSION = 1
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "emulator2000")
+
+BRANCHES = ("jz", "jnz", "jc", "jnc")
+SKIPS = ("btjr", "cpjr", "cpfjr")
+
+class Analysis():
+    #control-flow graph of the code reachable from the entry points of a program image
+    def __init__(self, image, entries = (0,)):
+        opcodes = array.array("H", bytes(image[:PROGRAM_SIZE * 2]))
+        if (sys.byteorder == "little"):
+            opcodes.byteswap()
+        self._disassembler = Disassembler()
+
+        #PC is 12 bits wide, like the CPU an entry wraps into program memory
+        self.entries = sorted({entry & 0xFFF for entry in entries})
+        #start -> (last pc, flow successors), calls leave a block and continue at the next word
+        self.blocks = {}
+        self.reachable = set()
+        self.labels = {}
+        #target -> sorted list of the pcs calling or jumping to it
+        self.callers = {}
+        self.jumps = {}
+        #function entry -> sorted list of the functions it calls
+        self.callees = {}
+        #pcs of ijmr, their targets depend on a register so every possible one is followed
+        self.computed = []
+
+        self._analyze(opcodes)
+
+    def _flow(self, opcode, pc):
+        #(flow successors, call target or None, jump target or None) of the instruction at pc
+        mnemonic = self._disassembler.text(opcode, pc).split(" ")[0]
+        following = (pc + 1) & 0xFFF
+        if (mnemonic == "jmp"):
+            return ((opcode & 0xFFF,), None, opcode & 0xFFF)
+        if (mnemonic == "call"):
+            return ((following,), opcode & 0xFFF, None)
+        if (mnemonic == "ret"):
+            return ((), None, None)
+        if (mnemonic in BRANCHES):
+            target = (opcode & 0x03FF) | (0xC00 & pc)
+            return ((following, target), None, target)
+        if (mnemonic in SKIPS):
+            target = (pc + 1 + (opcode & 0x1F)) & 0xFFF
+            return ((following, target), None, target)
+        if (mnemonic == "ijmr"):
+            self.computed.append(pc)
+            return (tuple((pc + 1 + offset) & 0xFFF for offset in range(16)), None, None)
+        return ((following,), None, None)
+
+    def _analyze(self, opcodes):
+        flows = {}
+        pending = list(self.entries)
+        while (pending):
+            pc = pending.pop()
+            if (pc in flows):
+                continue
+            flow = self._flow(opcodes[pc], pc)
+            flows[pc] = flow
+            successors, call, jump = flow
+            pending.extend(successors)
+            if (call != None):
+                pending.append(call)
+                self.callers.setdefault(call, []).append(pc)
+            if (jump != None):
+                self.jumps.setdefault(jump, []).append(pc)
+        self.reachable = set(flows)
+
+        leaders = set(self.entries) | set(self.callers) | set(self.jumps)
+        for pc, (successors, call, jump) in flows.items():
+            if (successors != ((pc + 1) & 0xFFF,) or call != None):
+                leaders.update(successors)
+        if (0xFFF in flows and 0 in flows):
+            leaders.add(0)
+        self.computed.sort()
+
+        for start in sorted(leaders & self.reachable):
+            pc = start
+            while True:
+                successors, call, jump = flows[pc]
+                following = (pc + 1) & 0xFFF
+                if (successors != (following,) or call != None or following in leaders or following not in flows or following == 0):
+                    break
+                pc = following
+            self.blocks[start] = (pc, successors)
+
+        for target in self.callers:
+            self.labels[target] = "sub_%0.3X" % target
+        for target in self.jumps:
+            self.labels.setdefault(target, "loc_%0.3X" % target)
+        for entry in self.entries:
+            self.labels.setdefault(entry, "entry_%0.3X" % entry)
+
+        for function in sorted(set(self.callers) | set(self.entries)):
+            called = set()
+            seen = set()
+            pending = [function]
+            while (pending):
+                start = pending.pop()
+                if (start in seen):
+                    continue
+                seen.add(start)
+                last, successors = self.blocks[start]
+                call = flows[last][1]
+                if (call != None):
+                    called.add(call)
+                pending.extend(successors)
+            self.callees[function] = sorted(called)
+
+        for references in (self.callers, self.jumps):
+            for target in references:
+                references[target].sort()
+
+    def toJson(self):
+        return {
+            "version": VERSION,
+            "entries": self.entries,
+            "blocks": [[start, last, list(successors)] for start, (last, successors) in sorted(self.blocks.items())],
+            "labels": sorted(self.labels.items()),
+            "callers": sorted(self.callers.items()),
+            "jumps": sorted(self.jumps.items()),
+            "callees": sorted(self.callees.items()),
+            "computed": self.computed,
+        }
+
+    @classmethod
+    def fromJson(cls, data):
+        analysis = cls.__new__(cls)
+        analysis.entries = data["entries"]
+        analysis.blocks = {start: (last, tuple(successors)) for start, last, successors in data["blocks"]}
+        analysis.reachable = {pc for start, (last, successors) in analysis.blocks.items() for pc in range(start, last + 1)}
+        analysis.labels = dict(data["labels"])
+        analysis.callers = dict(data["callers"])
+        analysis.jumps = dict(data["jumps"])
+        analysis.callees = dict(data["callees"])
+        analysis.computed = data["computed"]
+        return analysis
+
+def imageKey(image, entries = (0,)):
+    digest = hashlib.sha1(bytes(image[:PROGRAM_SIZE * 2]))
+    digest.update(("%d:%s" % (VERSION, ",".join("%d" % entry for entry in sorted({entry & 0xFFF for entry in entries})))).encode())
+    return digest.hexdigest()
+
+def analyze(image, entries = (0,), cacheDir = CACHE_DIR):
+    #Analysis of the image, read from cacheDir when this image was analyzed before, cacheDir None disables the cache
+    if (cacheDir == None):
+        return Analysis(image, entries)
+
+    path = os.path.join(cacheDir, imageKey(image, entries) + ".json")
+    try:
+        with open(path, "r") as file:
+            data = json.load(file)
+        if (data.get("version") == VERSION):
+            return Analysis.fromJson(data)
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    analysis = Analysis(image, entries)
+    try:
+        os.makedirs(cacheDir, exist_ok = True)
+        with open(path + ".tmp", "w") as file:
+            json.dump(analysis.toJson(), file)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        print(e.strerror, e.filename)
+    return analysis
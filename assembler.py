@@ -0,0 +1,186 @@
+import re
+
+from disassembler import Disassembler, GR_STR, SR_STR
+from memory import INTERNAL_SIZE, EXTERNAL_OFFSET, MEM_SIZE
+
+#jump targets are encoded relative to the next word or within the current 1K page
+RELATIVE = ("btjr", "cpjr", "cpfjr")
+PAGED = ("jz", "jnz", "jc", "jnc")
+
+REGISTERS = set(GR_STR) | set(SR_STR) | {"SR0"}
+SYMBOL = re.compile(r"[A-Za-z_.][A-Za-z0-9_.]*$")
+TERM = re.compile(r"\s*([+-]?)\s*('.'|[^\s+-][^+-]*)")
+QUOTED = re.compile(r"'.'")
+
+_encodings = None
+
+def encodings():
+    #(mnemonic, operands) -> lowest opcode disassembled to it, built once from the Disassembler itself
+    #so every text the Disassembler emits assembles back to an opcode with the same text
+    global _encodings
+    if (_encodings == None):
+        disassembler = Disassembler()
+        table = {}
+        for opcode in range(0x10000):
+            mnemonic, _, operands = disassembler.text(opcode, 0).partition(" ")
+            operands = [value if (value in REGISTERS) else int(value, 0) for value in operands.split(", ")] if (operands) else []
+            if (mnemonic in RELATIVE):
+                operands[-1] -= 1
+            table.setdefault((mnemonic, tuple(operands)), opcode)
+        _encodings = table
+    return _encodings
+
+def unquotedSplit(text, separator, maxsplit = -1):
+    #str.split that does not split inside a quoted character such as ';' or ':'
+    parts = []
+    start = 0
+    for part in QUOTED.sub("'_'", text).split(separator, maxsplit):
+        parts.append(text[start:start + len(part)])
+        start += len(part) + len(separator)
+    return parts
+
+class AssemblerError(Exception):
+    def __init__(self, line, message):
+        super().__init__("line %d: %s" % (line, message))
+        self.line = line
+
+class Assembler():
+    #two passes over the source, the first places labels, the second encodes
+    #  label:                       a label, may share its line with an instruction
+    #  0x0C0:                       places what follows at this word address, as in the analyze listing
+    #  name = expression            a constant
+    #  .org expression              places what follows at this word address
+    #  .word expression, ...        16-bit data words
+    #  .byte expression, ...        data bytes, external RAM is read byte by byte through SA
+    #  mnemonic operand, ...        as the Disassembler prints it, operands are registers or expressions
+    #expressions are sums of numbers (0x.., 0b.., decimal, 'c') and symbols, ; starts a comment
+    def __init__(self):
+        self._encodings = encodings()
+
+    def assemble(self, source):
+        #returns the whole program memory image and the range of bytes written
+        self._symbols = {}
+        self._image = bytearray(MEM_SIZE)
+        self._written = [MEM_SIZE, 0]
+
+        statements = self._place(source)
+        for line, addr, kind, name, operands in statements:
+            if (kind == "instruction"):
+                self._putWord(line, addr, self._encode(line, addr >> 1, name, operands))
+            elif (kind == ".word"):
+                for i, operand in enumerate(operands):
+                    self._putWord(line, addr + i * 2, self._value(line, operand) & 0xFFFF)
+            elif (kind == ".byte"):
+                for i, operand in enumerate(operands):
+                    self._putByte(line, addr + i, self._value(line, operand) & 0xFF)
+        return self._image, (min(self._written[0], self._written[1]), self._written[1])
+
+    def _place(self, source):
+        statements = []
+        addr = 0
+        for line, text in enumerate(source.splitlines(), 1):
+            text = unquotedSplit(text, ";", 1)[0].strip()
+            while (len(unquotedSplit(text, ":", 1)) == 2):
+                label, rest = unquotedSplit(text, ":", 1)
+                label = label.strip()
+                if (SYMBOL.match(label)):
+                    self._define(line, label, addr >> 1)
+                else:
+                    addr = self._value(line, label) << 1
+                text = rest.strip()
+            if (not text):
+                continue
+
+            if (len(unquotedSplit(text, "=", 1)) == 2):
+                name, expression = (part.strip() for part in unquotedSplit(text, "=", 1))
+                if (not SYMBOL.match(name)):
+                    raise AssemblerError(line, "bad constant name '%s'" % name)
+                self._define(line, name, expression)
+                continue
+
+            name, _, operands = text.partition(" ")
+            name = name.lower()
+            operands = [operand.strip() for operand in unquotedSplit(operands, ",")] if (operands.strip()) else []
+            if (name == ".org"):
+                addr = self._value(line, operands[0]) << 1
+            elif (name == ".word"):
+                statements.append((line, addr, name, name, operands))
+                addr += 2 * len(operands)
+            elif (name == ".byte"):
+                statements.append((line, addr, name, name, operands))
+                addr += len(operands)
+            elif (name.startswith(".")):
+                raise AssemblerError(line, "unknown directive '%s'" % name)
+            else:
+                if (addr & 0x01):
+                    raise AssemblerError(line, "instruction at an odd byte address")
+                statements.append((line, addr, "instruction", name, operands))
+                addr += 2
+        return statements
+
+    def _define(self, line, name, value):
+        if (name in self._symbols or name.upper() in REGISTERS):
+            raise AssemblerError(line, "'%s' is already defined" % name)
+        self._symbols[name] = value
+
+    def _value(self, line, expression, resolving = ()):
+        total = 0
+        position = 0
+        for match in TERM.finditer(expression):
+            if (match.start() != position):
+                break
+            position = match.end()
+            sign, term = match.group(1), match.group(2).strip()
+            if (term in self._symbols):
+                if (term in resolving):
+                    raise AssemblerError(line, "'%s' is defined in terms of itself" % term)
+                value = self._symbols[term]
+                if (isinstance(value, str)):
+                    value = self._value(line, value, resolving + (term,))
+                    self._symbols[term] = value
+            elif (len(term) == 3 and term[0] == "'" and term[2] == "'"):
+                value = ord(term[1])
+            else:
+                try:
+                    value = int(term, 0)
+                except ValueError:
+                    raise AssemblerError(line, "unknown symbol '%s'" % term)
+            total += -value if (sign == "-") else value
+        if (position != len(expression) or not expression.strip()):
+            raise AssemblerError(line, "bad expression '%s'" % expression)
+        return total
+
+    def _encode(self, line, pc, mnemonic, operands):
+        values = [operand.upper() if (operand.upper() in REGISTERS) else self._value(line, operand) for operand in operands]
+        values = ["RS0" if (value == "SR0") else value for value in values]
+        if (values and mnemonic in RELATIVE):
+            offset = (values[-1] - pc - 1) & 0xFFF
+            if (offset > 0x1F):
+                raise AssemblerError(line, "%s target 0x%X is more than 31 words after 0x%0.3X" % (mnemonic, values[-1], pc))
+            values[-1] = offset
+        elif (values and mnemonic in PAGED):
+            if ((values[-1] & ~0x3FF) != (pc & 0xC00)):
+                raise AssemblerError(line, "%s target 0x%X is outside the page of 0x%0.3X" % (mnemonic, values[-1], pc))
+            values[-1] &= 0x3FF
+        opcode = self._encodings.get((mnemonic, tuple(values)))
+        if (opcode == None):
+            raise AssemblerError(line, "no encoding for '%s %s'" % (mnemonic, ", ".join(operands)))
+        return opcode
+
+    def _putWord(self, line, addr, value):
+        self._putByte(line, addr, value >> 8)
+        self._putByte(line, addr + 1, value & 0xFF)
+
+    def _putByte(self, line, addr, value):
+        if (addr < 0 or addr >= MEM_SIZE):
+            raise AssemblerError(line, "address 0x%X is outside memory" % (addr >> 1))
+        self._image[addr] = value
+        self._written[0] = min(self._written[0], addr)
+        self._written[1] = max(self._written[1], addr + 1)
+
+def internalImage(image):
+    return bytes(image[:INTERNAL_SIZE])
+
+def externalImage(image, written):
+    #external RAM files hold the bytes from the start of external memory up to the last one written
+    return bytes(image[EXTERNAL_OFFSET:max(written[1], EXTERNAL_OFFSET)])
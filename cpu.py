@@ -13,19 +13,42 @@ SM_RUN = 3
 IM_REGISTERS = 0
 IM_DMA = 1
 
+EV_TIMER0 = 0
+EV_ISP = 1
+
+TIMER0_PERIOD = 128
+ISP_PERIOD = 24
+
+import heapq
+
 from memory import Memory
 from display import Display
-from beeper import Beeper
 
 class CPU():
-    def __init__(self, memory: Memory, display: Display, beeper: Beeper, transmit):
+    __slots__ = (
+        "_display", "_memory", "_beeper", "_transmit",
+        "_GR", "_banks", "_cbGR", "_abGR", "_SR", "_STACK",
+        "_PC", "_CB", "_AB", "_CF", "_ZF", "_bSA",
+        "_clockCounter", "_counter1", "_stopwatchMode",
+        "_ispScheduled", "_ispMode", "_ispTransmitEnable", "_ispReceiveEnable", "_ispTransmit", "_ispTransmitBuffer",
+        "_executionCounter", "_mcyclesCounter", "_instructions",
+        "_events", "_nextEvent", "_eventHandlers",
+        "_decoded",
+        "_execute", "_execute0x3C", "_execute0x7C", "_execute0x4C", "_execute0x50", "_execute0x60", "_execute0x64",
+        "_srWrite"
+    )
+
+    def __init__(self, memory: Memory, display: Display, beeper, transmit):
         self._display = display
         self._memory = memory
         self._beeper = beeper
         self._transmit = transmit
         
-        self._GR = [[0] * 32 for i in range(4)]
-        self._SR = [0] * 16
+        self._GR = bytearray(4 * 32)
+        self._banks = tuple(memoryview(self._GR)[i * 32:(i + 1) * 32] for i in range(4))
+        self._cbGR = self._banks[0]
+        self._abGR = self._banks[0]
+        self._SR = bytearray(16)
 
         self._STACK = []
 
@@ -36,12 +59,12 @@ class CPU():
         self._ZF = 0
         self._bSA = 0
 
-        self._counter0 = 0
+        self._clockCounter = 0
         self._counter1 = 0
 
         self._stopwatchMode = SM_DISABLE
 
-        self._ispCpunter = 0
+        self._ispScheduled = False
         self._ispMode = IM_REGISTERS
         self._ispTransmitEnable = False
         self._ispReceiveEnable = False
@@ -50,80 +73,97 @@ class CPU():
 
         self._executionCounter = 0
         self._mcyclesCounter = 0
+        self._instructions = 0
+
+        self._events = [(TIMER0_PERIOD, EV_TIMER0)]
+        self._nextEvent = TIMER0_PERIOD
+        self._eventHandlers = (CPU._timer0, CPU._isp)
+
+        self._decoded = memory.decodeCache()
 
         self._execute = (
-			CPU._add,
-			CPU._adb,
-			CPU._sub,
-			CPU._sbb,
-			CPU._adi,
-			CPU._adbi,
-			CPU._sbi,
-			CPU._sbbi,
-			CPU._adm,
-			CPU._adbm,
-			CPU._sbm,
-			CPU._sbbm,
-			CPU._cmp,
-			CPU._cpm,
-			CPU._cpi,
-			CPU._op0x3C, #LCRB, LARB
-			CPU._andi,
-			CPU._ori,
-			CPU._xori,
-			CPU._op0x4C, #INC, INCB, DEC, DECB
-			CPU._op0x50, #RSHM, LSHM
-			CPU._in,
-			CPU._out,
-			CPU._outi,
-			CPU._op0x60, #PSAM, PLAM
-			CPU._op0x64, #LDSM, STSM
-			CPU._stlm,
-			CPU._stl,
-			CPU._psai,
-			CPU._psai,
-			CPU._plai,
-			CPU._op0x7C, #STLS, #STLSA, #STLI, #STLIA,
-			CPU._mov,
-			CPU._movm,
-			CPU._ldi,
-			CPU._clrm,
-			CPU._mvac,
-			CPU._mvacm,
-			CPU._mvca,
-			CPU._mvcam,
-			CPU._call,
-			CPU._call,
-			CPU._call,
-			CPU._call,
-			CPU._ret,
-			CPU._cpfjr,
-			CPU._ijmr,
-			CPU._wfe,
-			CPU._jmp,
-			CPU._jmp,
-			CPU._jmp,
-			CPU._jmp,
-			CPU._jz,
-			CPU._jnz,
-			CPU._jc,
-			CPU._jnc,
-			CPU._btjr,
-			CPU._btjr,
-			CPU._btjr,
-			CPU._btjr,
-			CPU._cpjr,
-			CPU._cpjr,
-			CPU._cpjr,
-			CPU._cpjr,
+			(CPU._add, CPU._decRR),
+			(CPU._adb, CPU._decRR),
+			(CPU._sub, CPU._decRR),
+			(CPU._sbb, CPU._decRR),
+			(CPU._adi, CPU._decRI),
+			(CPU._adbi, CPU._decRI),
+			(CPU._sbi, CPU._decRI),
+			(CPU._sbbi, CPU._decRI),
+			(CPU._adm, CPU._decMM),
+			(CPU._adbm, CPU._decMM),
+			(CPU._sbm, CPU._decMM),
+			(CPU._sbbm, CPU._decMM),
+			(CPU._cmp, CPU._decRR),
+			(CPU._cpm, CPU._decMM),
+			(CPU._cpi, CPU._decRI),
+			(None, CPU._op0x3C), #LCRB, LARB
+			(CPU._andi, CPU._decRI),
+			(CPU._ori, CPU._decRI),
+			(CPU._xori, CPU._decRI),
+			(None, CPU._op0x4C), #INC, INCB, DEC, DECB
+			(None, CPU._op0x50), #RSHM, LSHM
+			(CPU._in, CPU._decRS),
+			(CPU._out, CPU._decRS),
+			(CPU._outi, CPU._decOuti),
+			(None, CPU._op0x60), #PSAM, PLAM
+			(None, CPU._op0x64), #LDSM, STSM
+			(CPU._stlm, CPU._decMP),
+			(CPU._stl, CPU._decR),
+			(CPU._psai, CPU._decSA),
+			(CPU._psai, CPU._decSA),
+			(CPU._plai, CPU._decLA),
+			(None, CPU._op0x7C), #STLS, #STLSA, #STLI, #STLIA,
+			(CPU._mov, CPU._decRR),
+			(CPU._movm, CPU._decMM),
+			(CPU._ldi, CPU._decRI),
+			(CPU._clrm, CPU._decM),
+			(CPU._mvac, CPU._decRR),
+			(CPU._mvacm, CPU._decMM),
+			(CPU._mvca, CPU._decRR),
+			(CPU._mvcam, CPU._decMM),
+			(CPU._call, CPU._decJmp),
+			(CPU._call, CPU._decJmp),
+			(CPU._call, CPU._decJmp),
+			(CPU._call, CPU._decJmp),
+			(CPU._ret, CPU._decR),
+			(CPU._cpfjr, CPU._decSkip),
+			(CPU._ijmr, CPU._decR),
+			(CPU._wfe, CPU._decR),
+			(CPU._jmp, CPU._decJmp),
+			(CPU._jmp, CPU._decJmp),
+			(CPU._jmp, CPU._decJmp),
+			(CPU._jmp, CPU._decJmp),
+			(CPU._jz, CPU._decJmpPage),
+			(CPU._jnz, CPU._decJmpPage),
+			(CPU._jc, CPU._decJmpPage),
+			(CPU._jnc, CPU._decJmpPage),
+			(CPU._btjr, CPU._decBtjr),
+			(CPU._btjr, CPU._decBtjr),
+			(CPU._btjr, CPU._decBtjr),
+			(CPU._btjr, CPU._decBtjr),
+			(CPU._cpjr, CPU._decCpjr),
+			(CPU._cpjr, CPU._decCpjr),
+			(CPU._cpjr, CPU._decCpjr),
+			(CPU._cpjr, CPU._decCpjr),
         )
 
-        self._execute0x3C = (CPU._lcrb, CPU._larb)
-        self._execute0x7C = (CPU._stls, CPU._stlsa, CPU._stli, CPU._stlia)
-        self._execute0x4C = (CPU._inc, CPU._incb, CPU._dec, CPU._decb)
-        self._execute0x50 = (CPU._rshm, CPU._lshm)
-        self._execute0x60 = (CPU._psam, CPU._plam)
-        self._execute0x64 = (CPU._stsm, CPU._ldsm)
+        self._execute0x3C = ((CPU._lcrb, CPU._decBank), (CPU._larb, CPU._decBank))
+        self._execute0x7C = (
+            (CPU._stls, CPU._decR),
+            (CPU._stlsa, CPU._decLA),
+            (CPU._stli, CPU._decLA),
+            (CPU._stlia, CPU._decLA)
+        )
+        self._execute0x4C = (
+            (CPU._inc, CPU._decM),
+            (CPU._incb, CPU._decM),
+            (CPU._dec, CPU._decM),
+            (CPU._decb, CPU._decM)
+        )
+        self._execute0x50 = ((CPU._rshm, CPU._decRshm), (CPU._lshm, CPU._decLshm))
+        self._execute0x60 = ((CPU._psam, CPU._decPM), (CPU._plam, CPU._decPM))
+        self._execute0x64 = ((CPU._stsm, CPU._decMP), (CPU._ldsm, CPU._decLdsm))
 
         self._srWrite = (
             CPU._sr0Write,
@@ -144,31 +184,42 @@ class CPU():
             CPU._sr15Write,
         )
 
-    def examine(self):
-        return {
-            "PC": self._PC,
-            "CB": self._CB,
-            "AB": self._AB,
-            "CF": self._CF,
-            "ZF": self._ZF,
-            "SR": {i : value for i, value in enumerate(self._SR)},
-            "GR": {i : {j : value for j, value in enumerate(self._GR[i])} for i in range(4)},
-        }
+    def snapshot(self):
+        return (self._PC, self._CB, self._AB, self._CF, self._ZF, bytes(self._SR), bytes(self._GR))
+
+    def examine(self, snapshot = None, keys = None):
+        #registers that differ from snapshot, all of them without one, keys names the ones wanted
+        PC, CB, AB, CF, ZF, SR, GR = snapshot if (snapshot != None) else (None,) * 7
+        info = {}
+        for name, old, value in zip(("PC", "CB", "AB", "CF", "ZF"), (PC, CB, AB, CF, ZF), (self._PC, self._CB, self._AB, self._CF, self._ZF)):
+            if (value != old and (keys == None or name in keys)):
+                info[name] = value
+        if ((keys == None or "SR" in keys) and SR != self._SR):
+            info["SR"] = {i : value for i, value in enumerate(self._SR) if SR == None or value != SR[i]}
+        if ((keys == None or "GR" in keys) and GR != self._GR):
+            info["GR"] = {}
+            for i, bank in enumerate(self._banks):
+                changed = {j : value for j, value in enumerate(bank) if GR == None or value != GR[i * 32 + j]}
+                if (changed):
+                    info["GR"][i] = changed
+        return info
 
     def setSR(self, index, value):
         self._srWrite[index](self, value & 0xF)
 
     def setGR(self, bank, index, value):
-        self._GR[bank][index] = value & 0xF
+        self._banks[bank][index] = value & 0xF
 
     def setPC(self, value):
         self._PC = value & 0xFFF
 
     def setCB(self, value):
         self._CB = value & 0x3
+        self._cbGR = self._banks[self._CB]
 
     def setAB(self, value):
         self._AB = value & 0x3
+        self._abGR = self._banks[self._AB]
 
     def setCF(self, value):
         self._CF = value & 0x1
@@ -200,25 +251,45 @@ class CPU():
                     self._SR[1] |= b2 if (self._ispTransmitEnable) else b0
                     self._SR[0] |= b3
 
-    def _isp(self):
-        self._ispCpunter += 1
-        if (self._ispCpunter % 24 == 0):
-            if (self._ispTransmit and self._ispTransmitEnable):
-                if (self._ispMode == IM_DMA):
-                    self._ispTransmitBuffer = self._memory.readExternal()
-                    if (self._memory.SA() & 0xFF == 0):
-                        self._SR[1] |= b3
-                        self._SR[0] |= b3
-                        self._ispTransmit = False
-                else:
-                    self._SR[1] |= b2
+    def _schedule(self, cycle, event):
+        heapq.heappush(self._events, (cycle, event))
+        self._nextEvent = self._events[0][0]
+
+    def _processEvents(self):
+        events = self._events
+        while (events[0][0] <= self._clockCounter):
+            cycle, event = heapq.heappop(events)
+            self._eventHandlers[event](self, cycle)
+        self._nextEvent = events[0][0]
+
+    def _scheduleIsp(self):
+        #the ISP only does something on every 24th cycle while a transmission is pending
+        if (self._ispTransmit and self._ispTransmitEnable and not self._ispScheduled):
+            self._ispScheduled = True
+            self._schedule((self._clockCounter // ISP_PERIOD + 1) * ISP_PERIOD, EV_ISP)
+
+    def _isp(self, cycle):
+        if (self._ispTransmit and self._ispTransmitEnable):
+            if (self._ispMode == IM_DMA):
+                self._ispTransmitBuffer = self._memory.readExternal()
+                if (self._memory.SA() & 0xFF == 0):
+                    self._SR[1] |= b3
                     self._SR[0] |= b3
                     self._ispTransmit = False
-                if (self._transmit != None):
-                    self._transmit(self._ispTransmitBuffer)
-                if (self._ispReceiveEnable):
-                    self._SR[5] = (self._ispTransmitBuffer >> 4) & 0x0F
-                    self._SR[6] = self._ispTransmitBuffer & 0x0F
+            else:
+                self._SR[1] |= b2
+                self._SR[0] |= b3
+                self._ispTransmit = False
+            if (self._transmit != None):
+                self._transmit(self._ispTransmitBuffer)
+            if (self._ispReceiveEnable):
+                self._SR[5] = (self._ispTransmitBuffer >> 4) & 0x0F
+                self._SR[6] = self._ispTransmitBuffer & 0x0F
+
+        if (self._ispTransmit and self._ispTransmitEnable):
+            self._schedule(cycle + ISP_PERIOD, EV_ISP)
+        else:
+            self._ispScheduled = False
 
     def PC(self):
         return self._PC
@@ -226,12 +297,16 @@ class CPU():
     def mcycles(self):
         return self._mcyclesCounter
 
-    def _timer0(self):
-        self._counter0 += 1
-        if (self._counter0 % 128 == 0):
-            if (self._SR[13] & b3 == 0):
-                self._SR[12] |= b3
-        if (self._counter0 % 256 == 0):
+    def clocks(self):
+        return self._clockCounter
+
+    def instructions(self):
+        return self._instructions
+
+    def _timer0(self, cycle):
+        if (self._SR[13] & b3 == 0):
+            self._SR[12] |= b3
+        if (cycle % 256 == 0):
             if (self._SR[13] & b2 == 0):
                 self._SR[12] |= b2
             self._SR[14] += 1
@@ -240,21 +315,23 @@ class CPU():
                 if (self._SR[13] & b0 == 0):
                     self._SR[12] |= b0
                     self._SR[4] = (self._SR[4] + 1) & 0x3
-        if (self._counter0 % 1024 == 0):
+        if (cycle % 1024 == 0):
             if (self._SR[13] & b1 == 0):
                 self._SR[12] |= b1
+        #SR12 bits are only cleared together with SR0.0, so it is enough to raise it here
         if (self._SR[12]):
             self._SR[0] |= b0
 
+        self._schedule(cycle + TIMER0_PERIOD, EV_TIMER0)
+
     def _timer1(self):
-        if (self._SR[9] & b3):
-            self._counter1 += self._counter1
-            if (self._counter1 % 38 == 0):
-                self._SR[10] += 1
-                if self._SR[10] > 9:
-                    self._SR[10] = 0
-                    self._SR[9] |= b2
-                    self._SR[3] = (self._SR[3] + 1) & 0x3
+        self._counter1 += self._counter1
+        if (self._counter1 % 38 == 0):
+            self._SR[10] += 1
+            if self._SR[10] > 9:
+                self._SR[10] = 0
+                self._SR[9] |= b2
+                self._SR[3] = (self._SR[3] + 1) & 0x3
     
     def _timer1StopwatchProcess(self, keyCode):
         if (keyCode == 0):
@@ -274,809 +351,814 @@ class CPU():
                 self._SR[9] |= b3
             
     def clock(self):
-        self._timer0()
-        self._timer1()
-        self._isp()
+        self._clockCounter += 1
+        if (self._clockCounter >= self._nextEvent):
+            self._processEvents()
+        if (self._SR[9] & b3):
+            self._timer1()
         
         self._executionCounter -= 1
         if (self._executionCounter <= 0):
-            opcode = self._memory.getOpcode(self._PC)
-            self._executionCounter = self._execute[opcode >> 10](self, opcode)
+            decoded = self._decoded[self._PC]
+            if (decoded == None):
+                decoded = self._decode(self._PC)
+            self._instructions += 1
+            self._executionCounter = decoded[0](self, *decoded[1])
             self._mcyclesCounter += self._executionCounter
             self._PC = self._PC & 0xFFF
     
         return self._executionCounter
-    
-    def _op0x3C(self, opcode):
-        adOp = (opcode >> 9) & 0x01
-        return self._execute0x3C[adOp](self, opcode)
 
-    def _op0x7C(self, opcode):
-        adOp = (opcode >> 3) & 0x03
-        return self._execute0x7C[adOp](self, opcode)
+    def run(self, mcycles, breakpoints = None):
+        #same as clock() followed by display.clock() for each of mcycles, stops after a cycle ending on a breakpoint
+        #while the CPU waits on wfe with SR0 clear, cycles up to the next scheduled event are skipped at once
+        #skipped wfe repeats are not dispatched, so they are not counted in instructions()
+        processEvents = self._processEvents
+        timer1 = self._timer1
+        SR = self._SR
+        displayClock = self._display.clock
+        displayAdvance = self._display.advance
+        wfe = CPU._wfe
+        decodedCache = self._decoded
+        decode = self._decode
+
+        counter = self._executionCounter
+        mcyclesCounter = self._mcyclesCounter
+        instructions = self._instructions
+        cycle = 0
+        while (cycle < mcycles):
+            cycle += 1
+            self._clockCounter += 1
+            if (self._clockCounter >= self._nextEvent):
+                processEvents()
+            if (SR[9] & b3):
+                timer1()
+
+            idle = False
+            counter -= 1
+            if (counter <= 0):
+                pc = self._PC
+                decoded = decodedCache[pc]
+                if (decoded == None):
+                    decoded = decode(pc)
+                instructions += 1
+                counter = decoded[0](self, *decoded[1])
+                idle = decoded[0] is wfe and self._PC == pc
+                mcyclesCounter += counter
+                self._PC &= 0xFFF
+
+            displayClock()
+
+            if (breakpoints and self._PC in breakpoints):
+                break
+
+            if (idle and not SR[0] and not (SR[9] & b3)):
+                #parked on wfe, nothing changes until the next timer or ISP edge
+                skip = min(self._nextEvent - self._clockCounter - 1, mcycles - cycle)
+                if (skip > 0):
+                    GR = self._cbGR
+                    for i in range(min(skip, 3)):
+                        self._bSA = (self._bSA >> 4) | (GR[decoded[1][0]] << 8)
+                    displayAdvance(skip)
+                    self._clockCounter += skip
+                    mcyclesCounter += skip
+                    cycle += skip
+
+        self._executionCounter = counter
+        self._mcyclesCounter = mcyclesCounter
+        self._instructions = instructions
+        return cycle
+
+    def _decode(self, pc):
+        opcode = self._memory.getOpcode(pc)
+        handler, decoder = self._execute[opcode >> 10]
+        decoded = decoder(self, handler, opcode)
+        self._decoded[pc] = decoded
+        return decoded
+
+    def _op0x3C(self, handler, opcode):
+        handler, decoder = self._execute0x3C[(opcode >> 9) & 0x01]
+        return decoder(self, handler, opcode)
+
+    def _op0x7C(self, handler, opcode):
+        handler, decoder = self._execute0x7C[(opcode >> 3) & 0x03]
+        return decoder(self, handler, opcode)
+
+    def _op0x4C(self, handler, opcode):
+        handler, decoder = self._execute0x4C[(opcode >> 3) & 0x03]
+        return decoder(self, handler, opcode)
+
+    def _op0x50(self, handler, opcode):
+        handler, decoder = self._execute0x50[(opcode >> 3) & 0x01]
+        return decoder(self, handler, opcode)
+
+    def _op0x60(self, handler, opcode):
+        handler, decoder = self._execute0x60[(opcode >> 4) & 0x01]
+        return decoder(self, handler, opcode)
+
+    def _op0x64(self, handler, opcode):
+        handler, decoder = self._execute0x64[(opcode >> 3) & 0x01]
+        return decoder(self, handler, opcode)
+
+    def _decR(self, handler, opcode):
+        return (handler, ((opcode >> 5) & 0x1F,))
+
+    def _decRR(self, handler, opcode):
+        return (handler, ((opcode >> 5) & 0x1F, opcode & 0x1F))
+
+    def _decRS(self, handler, opcode):
+        return (handler, ((opcode >> 5) & 0x1F, opcode & 0x0F))
+
+    def _decRI(self, handler, opcode):
+        return (handler, ((opcode >> 5) & 0x1F, (opcode >> 1) & 0x0F))
+
+    def _decMM(self, handler, opcode):
+        grHi = (opcode >> 5) & 0x1F
+        grLo = (opcode & 0x1F)
+        pageF = grHi & 0xF8
+        pageL = grLo & 0xF8
+
+        len = ((grLo - grHi) & 0x07) + 1
+        pairs = tuple((pageF + (gr & 0x07), pageL + (gr & 0x07)) for gr in range(grHi, grHi + len))
+        return (handler, (pairs,))
+
+    def _decM(self, handler, opcode):
+        grHi = (opcode >> 5) & 0x1F
+        grLo = opcode & 0x07
+        page = grHi & 0xF8
 
-    def _op0x4C(self, opcode):
-        adOp = (opcode >> 3) & 0x03
-        return self._execute0x4C[adOp](self, opcode)
+        len = ((grLo - grHi) & 0x07) + 1
+        return (handler, (tuple(page + (gr & 0x07) for gr in range(grHi, grHi + len)),))
 
-    def _op0x50(self, opcode):
-        adOp = (opcode >> 3) & 0x01
-        return self._execute0x50[adOp](self, opcode)
+    def _decRshm(self, handler, opcode):
+        grHi = (opcode >> 5) & 0x1F
+        grLo = opcode & 0x07
+        page = grHi & 0xF8
 
-    def _op0x60(self, opcode):
-        adOp = (opcode >> 4) & 0x01
-        return self._execute0x60[adOp](self, opcode)
+        len = ((grLo - grHi) & 0x07)
+        pairs = tuple((page + (gr & 0x07), page + ((gr - 1) & 0x07)) for gr in range(grHi + len, grHi, -1))
+        return (handler, (pairs, grHi))
 
-    def _op0x64(self, opcode):
-        adOp = (opcode >> 3) & 0x01
-        return self._execute0x64[adOp](self, opcode)
+    def _decLshm(self, handler, opcode):
+        grLo = (opcode >> 5) & 0x1F
+        grHi = opcode & 0x07
+        page = grLo & 0xF8
+
+        len = ((grLo - grHi) & 0x07)
+        pairs = tuple((page + (gr & 0x07), page + ((gr + 1) & 0x07)) for gr in range(grHi, grHi + len))
+        return (handler, (pairs, grLo))
+
+    def _decOuti(self, handler, opcode):
+        return (handler, ((opcode >> 5) & 0x1F, opcode & 0x0F, (opcode >> 6) & 0x0F))
+
+    def _decPM(self, handler, opcode):
+        grLo = (opcode >> 5) & 0x1F
+        page = grLo & 0x18
+        grHi = page | (opcode & 0x07)
+
+        len = ((grHi - grLo) & 0x07) + 1
+        return (handler, (tuple(page + (gr & 0x07) for gr in range(grLo, grLo + len)),))
+
+    def _decMP(self, handler, opcode):
+        grHi = (opcode >> 5) & 0x1F
+        grLo = (grHi & 0x18) | (opcode & 0x07)
+        page = grHi & 0xF8
+
+        len = ((grLo - grHi) & 0x07) + 1
+        pairs = tuple((page + (gr & 0x07), page + ((gr - 1) & 0x07)) for gr in range(grHi + 1, grHi + len))
+        return (handler, (pairs, len))
+
+    def _decLdsm(self, handler, opcode):
+        grHi = (opcode >> 5) & 0x1F
+        grLo = (grHi & 0x18) | (opcode & 0x07)
+        page = grHi & 0xF8
+
+        len = ((grLo - grHi) & 0x07) + 1
+        return (handler, (grHi, tuple(page + (gr & 0x07) for gr in range(grHi + 1, grHi + len)), len))
+
+    def _decSA(self, handler, opcode):
+        return (handler, ((opcode >> 5) & 0x1F, opcode & 0x7FF))
+
+    def _decLA(self, handler, opcode):
+        return (handler, ((opcode >> 5) & 0x1F, ((opcode >> 2) & 0xF8) | (opcode & 0x07)))
+
+    def _decBank(self, handler, opcode):
+        return (handler, ((opcode >> 5) & 0x1F, (opcode >> 3) & 0x03))
+
+    def _decJmp(self, handler, opcode):
+        return (handler, ((opcode >> 5) & 0x1F, opcode & 0xFFF))
+
+    def _decJmpPage(self, handler, opcode):
+        return (handler, ((opcode >> 5) & 0x1F, opcode & 0x03FF))
+
+    def _decSkip(self, handler, opcode):
+        return (handler, ((opcode >> 5) & 0x1F, opcode & 0x1F))
+
+    def _decBtjr(self, handler, opcode):
+        return (handler, ((opcode >> 5) & 0x1F, 1 << ((opcode >> 10) & 0x03), opcode & 0x1F))
+
+    def _decCpjr(self, handler, opcode):
+        return (handler, ((opcode >> 5) & 0x1F, (opcode >> 10) & 0x03, opcode & 0x1F))
         
-    def _add(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        grS = opcode & 0x1F
+    def _add(self, grD, grS):
+        GR = self._cbGR
 
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-        self._GR[self._CB][grD] += self._GR[self._CB][grS]
+        value = GR[grD] + GR[grS]
 
-        self._CF = 1 if self._GR[self._CB][grD] > 15 else 0
-        self._GR[self._CB][grD] &= 0xF
+        self._CF = 1 if value > 15 else 0
+        GR[grD] = value & 0xF
         self._PC += 1
 
         return 1
 
-    def _adb(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        grS = opcode & 0x1F
+    def _adb(self, grD, grS):
+        GR = self._cbGR
 
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-        self._GR[self._CB][grD] += self._GR[self._CB][grS]
+        value = GR[grD] + GR[grS]
 
-        self._CF = 1 if self._GR[self._CB][grD] > 9 else 0
-        if (self._CF): self._GR[self._CB][grD] -= 10
-        self._GR[self._CB][grD] &= 0xF
+        self._CF = 1 if value > 9 else 0
+        if (self._CF): value -= 10
+        GR[grD] = value & 0xF
         self._PC += 1
 
         return 1
 
-    def _sub(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        grS = opcode & 0x1F
+    def _sub(self, grD, grS):
+        GR = self._cbGR
 
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-        self._GR[self._CB][grD] -= self._GR[self._CB][grS]
+        value = GR[grD] - GR[grS]
 
-        self._ZF = 0 if (self._GR[self._CB][grD]) else 1
-        self._CF = 1 if (self._GR[self._CB][grD] < 0) else 0
-        self._GR[self._CB][grD] &= 0xF
+        self._ZF = 0 if (value) else 1
+        self._CF = 1 if (value < 0) else 0
+        GR[grD] = value & 0xF
         self._PC += 1
 
         return 1
 
-    def _sbb(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        grS = opcode & 0x1F
+    def _sbb(self, grD, grS):
+        GR = self._cbGR
 
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-        self._GR[self._CB][grD] -= self._GR[self._CB][grS]
+        value = GR[grD] - GR[grS]
 
-        self._ZF = 0 if (self._GR[self._CB][grD]) else 1
-        self._CF = self._GR[self._CB][grD] < 0
-        self._GR[self._CB][grD] -= 6 * self._CF
-        self._GR[self._CB][grD] &= 0xF
+        self._ZF = 0 if (value) else 1
+        self._CF = value < 0
+        GR[grD] = (value - 6 * self._CF) & 0xF
         self._PC += 1
 
         return 1
 
-    def _adi(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        imd = (opcode >> 1) & 0xF
+    def _adi(self, grD, imd):
+        GR = self._cbGR
 
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
         
-        self._GR[self._CB][grD] += imd
+        value = GR[grD] + imd
 
-        self._CF = self._GR[self._CB][grD] > 15
-        self._GR[self._CB][grD] &= 0xF
+        self._CF = value > 15
+        GR[grD] = value & 0xF
         self._PC += 1
 
         return 1
 
-    def _adbi(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        imd = (opcode >> 1) & 0xF
+    def _adbi(self, grD, imd):
+        GR = self._cbGR
 
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
         
-        self._GR[self._CB][grD] += imd
+        value = GR[grD] + imd
 
-        self._CF = self._GR[self._CB][grD] > 9
-        self._GR[self._CB][grD] -= 10 * self._CF
-        self._GR[self._CB][grD] &= 0xF
+        self._CF = value > 9
+        GR[grD] = (value - 10 * self._CF) & 0xF
         self._PC += 1
 
         return 1
 
-    def _sbi(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        imd = (opcode >> 1) & 0xF
+    def _sbi(self, grD, imd):
+        GR = self._cbGR
 
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
         
-        self._GR[self._CB][grD] -= imd
+        value = GR[grD] - imd
 
-        self._ZF = self._GR[self._CB][grD] == 0
-        self._CF = self._GR[self._CB][grD] < 0
-        self._GR[self._CB][grD] &= 0xF
+        self._ZF = value == 0
+        self._CF = value < 0
+        GR[grD] = value & 0xF
         self._PC += 1
 
         return 1
 
-    def _sbbi(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        imd = (opcode >> 1) & 0xF
+    def _sbbi(self, grD, imd):
+        GR = self._cbGR
 
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
         
-        self._GR[self._CB][grD] -= imd
+        value = GR[grD] - imd
 
-        self._ZF = self._GR[self._CB][grD] == 0
-        self._CF = self._GR[self._CB][grD] < 0
-        self._GR[self._CB][grD] -= 6 * self._CF
-        self._GR[self._CB][grD] &= 0xF
+        self._ZF = value == 0
+        self._CF = value < 0
+        GR[grD] = (value - 6 * self._CF) & 0xF
         self._PC += 1
 
         return 1
 
-    def _adm(self, opcode):
-        grHi = (opcode >> 5) & 0x1F
-        grLo = (opcode & 0x1F)
-        pageF = grHi & 0xF8
-        pageL = grLo & 0xF8
+    def _adm(self, pairs):
+        GR = self._cbGR
 
         self._CF = 0
 
-        len = ((grLo - grHi) & 0x07) + 1
-        for gr in range(grHi, grHi + len):
-            grD = pageF + (gr & 0x07)
-            grS = pageL + (gr & 0x07)
-
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        for grD, grS in pairs:
+            self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
             
-            self._GR[self._CB][grD] += self._GR[self._CB][grS] + self._CF
-            self._CF = self._GR[self._CB][grD] > 15
-            self._GR[self._CB][grD] &= 0xF
+            value = GR[grD] + GR[grS] + self._CF
+            self._CF = value > 15
+            GR[grD] = value & 0xF
 
         self._PC += 1
 
-        return 1 * len
+        return len(pairs)
 
-    def _adbm(self, opcode):
-        grHi = (opcode >> 5) & 0x1F
-        grLo = (opcode & 0x1F)
-        pageF = grHi & 0xF8
-        pageL = grLo & 0xF8
+    def _adbm(self, pairs):
+        GR = self._cbGR
 
         self._CF = 0
 
-        len = ((grLo - grHi) & 0x07) + 1
-        for gr in range(grHi, grHi + len):
-            grD = pageF + (gr & 0x07)
-            grS = pageL + (gr & 0x07)
+        for grD, grS in pairs:
+            self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
-
-            self._GR[self._CB][grD] += self._GR[self._CB][grS] + self._CF
-            self._CF = self._GR[self._CB][grD] > 9
-            self._GR[self._CB][grD] -= 10 * self._CF
-            self._GR[self._CB][grD] &= 0xF
+            value = GR[grD] + GR[grS] + self._CF
+            self._CF = value > 9
+            GR[grD] = (value - 10 * self._CF) & 0xF
 
         self._PC += 1
 
-        return 1 * len
+        return len(pairs)
 
-    def _sbm(self, opcode):
-        grHi = (opcode >> 5) & 0x1F
-        grLo = (opcode & 0x1F)
-        pageF = grHi & 0xF8
-        pageL = grLo & 0xF8
+    def _sbm(self, pairs):
+        GR = self._cbGR
 
         self._CF = 0
         self._ZF = 1
 
-        len = ((grLo - grHi) & 0x07) + 1
-        for gr in range(grHi, grHi + len):
-            grD = pageF + (gr & 0x07)
-            grS = pageL + (gr & 0x07)
-
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        for grD, grS in pairs:
+            self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
             
-            self._GR[self._CB][grD] -= self._GR[self._CB][grS] + self._CF
-            self._ZF &= 1 if (self._GR[self._CB][grD] == 0) else 0
-            self._CF = 1 if (self._GR[self._CB][grD] < 0) else 0
-            self._GR[self._CB][grD] &= 0xF
+            value = GR[grD] - (GR[grS] + self._CF)
+            self._ZF &= 1 if (value == 0) else 0
+            self._CF = 1 if (value < 0) else 0
+            GR[grD] = value & 0xF
 
         self._PC += 1
 
-        return 1 * len
+        return len(pairs)
 
-    def _sbbm(self, opcode):
-        grHi = (opcode >> 5) & 0x1F
-        grLo = (opcode & 0x1F)
-        pageF = grHi & 0xF8
-        pageL = grLo & 0xF8
+    def _sbbm(self, pairs):
+        GR = self._cbGR
 
         self._CF = 0
         self._ZF = 1
 
-        len = ((grLo - grHi) & 0x07) + 1
-        for gr in range(grHi, grHi + len):
-            grD = pageF + (gr & 0x07)
-            grS = pageL + (gr & 0x07)
-
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        for grD, grS in pairs:
+            self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
             
-            self._GR[self._CB][grD] -= self._GR[self._CB][grS] + self._CF
-            self._ZF &= self._GR[self._CB][grD] == 0
-            self._CF = self._GR[self._CB][grD] < 0
-            self._GR[self._CB][grD] -= 6 * self._CF
-            self._GR[self._CB][grD] &= 0xF
+            value = GR[grD] - (GR[grS] + self._CF)
+            self._ZF &= value == 0
+            self._CF = value < 0
+            GR[grD] = (value - 6 * self._CF) & 0xF
 
         self._PC += 1
 
-        return 1 * len
+        return len(pairs)
 
-    def _cmp(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        grS = opcode & 0x1F
+    def _cmp(self, grD, grS):
+        GR = self._cbGR
 
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-        self._ZF = self._GR[self._CB][grD] == self._GR[self._CB][grS]
-        self._CF = self._GR[self._CB][grD] < self._GR[self._CB][grS]
+        self._ZF = GR[grD] == GR[grS]
+        self._CF = GR[grD] < GR[grS]
 
         self._PC += 1
 
         return 1
 
-    def _cpm(self, opcode):
-        grHi = (opcode >> 5) & 0x1F
-        grLo = (opcode & 0x1F)
-        pageF = grHi & 0xF8
-        pageL = grLo & 0xF8
+    def _cpm(self, pairs):
+        GR = self._cbGR
 
         self._CF = 0
         self._ZF = 1
 
-        len = ((grLo - grHi) & 0x07) + 1
-        for gr in range(grHi, grHi + len):
-            grD = pageF + (gr & 0x07)
-            grS = pageL + (gr & 0x07)
-
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        for grD, grS in pairs:
+            self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-            self._ZF &= self._GR[self._CB][grD] == (self._GR[self._CB][grS] + self._CF)
-            self._CF = self._GR[self._CB][grD] < (self._GR[self._CB][grS] + self._CF)
+            self._ZF &= GR[grD] == (GR[grS] + self._CF)
+            self._CF = GR[grD] < (GR[grS] + self._CF)
 
         self._PC += 1
 
-        return 1 * len
+        return len(pairs)
 
-    def _cpi(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        imd = (opcode >> 1) & 0x0F
+    def _cpi(self, grD, imd):
+        GR = self._cbGR
         
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-        self._ZF = self._GR[self._CB][grD] == imd
-        self._CF = self._GR[self._CB][grD] < imd
+        self._ZF = GR[grD] == imd
+        self._CF = GR[grD] < imd
         self._PC += 1
         
         return 1
 
-    def _lcrb(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+    def _lcrb(self, grD, bank):
+        self._bSA = (self._bSA >> 4) | (self._cbGR[grD] << 8)
 
-        self._CB = (opcode >> 3) & 0x03
+        self._CB = bank
+        self._cbGR = self._banks[bank]
         self._PC += 1
 
         return 1
 
-    def _larb(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+    def _larb(self, grD, bank):
+        self._bSA = (self._bSA >> 4) | (self._cbGR[grD] << 8)
 
-        self._AB = (opcode >> 3) & 0x03
+        self._AB = bank
+        self._abGR = self._banks[bank]
         self._PC += 1
 
         return 1
 
-    def _andi(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        imd = (opcode >> 1) & 0x0F
+    def _andi(self, grD, imd):
+        GR = self._cbGR
         
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-        self._GR[self._CB][grD] &= imd
-        self._ZF = self._GR[self._CB][grD] == 0
+        GR[grD] &= imd
+        self._ZF = GR[grD] == 0
         self._PC += 1
 
         return 1
 
-    def _ori(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        imd = (opcode >> 1) & 0x0F
+    def _ori(self, grD, imd):
+        GR = self._cbGR
         
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-        self._GR[self._CB][grD] |= imd
+        GR[grD] |= imd
         self._PC += 1
 
         return 1
 
-    def _xori(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        imd = (opcode >> 1) & 0x0F
+    def _xori(self, grD, imd):
+        GR = self._cbGR
         
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-        self._GR[self._CB][grD] ^= imd
+        GR[grD] ^= imd
         self._PC += 1
 
         return 1
 
-    def _inc(self, opcode):
-        grHi = (opcode >> 5) & 0x1F
-        grLo = opcode & 0x07
-        page = grHi & 0xF8
+    def _inc(self, regs):
+        GR = self._cbGR
         
         self._CF = 1
 
-        len = ((grLo - grHi) & 0x07) + 1
-        for gr in range(grHi, grHi + len):
-            grD = page + (gr & 0x07)
-
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        for grD in regs:
+            self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-            self._GR[self._CB][grD] += self._CF
-            self._CF = self._GR[self._CB][grD] > 15
-            self._GR[self._CB][grD] &= 0xF
+            value = GR[grD] + self._CF
+            self._CF = value > 15
+            GR[grD] = value & 0xF
 
         self._PC += 1
 
-        return 1 * len
+        return len(regs)
 
-    def _incb(self, opcode):
-        grHi = (opcode >> 5) & 0x1F
-        grLo = opcode & 0x07
-        page = grHi & 0xF8
+    def _incb(self, regs):
+        GR = self._cbGR
 
         self._CF = 1
 
-        len = ((grLo - grHi) & 0x07) + 1
-        for gr in range(grHi, grHi + len):
-            grD = page + (gr & 0x07)
-
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        for grD in regs:
+            self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-            self._GR[self._CB][grD] += self._CF
-            self._CF = self._GR[self._CB][grD] > 9
-            self._GR[self._CB][grD] -= 10 * self._CF
-            self._GR[self._CB][grD] &= 0xF
+            value = GR[grD] + self._CF
+            self._CF = value > 9
+            GR[grD] = (value - 10 * self._CF) & 0xF
 
         self._PC += 1
 
-        return 1 * len
+        return len(regs)
 
-    def _dec(self, opcode):
-        grHi = (opcode >> 5) & 0x1F
-        grLo = opcode & 0x07
-        page = grHi & 0xF8
+    def _dec(self, regs):
+        GR = self._cbGR
 
         self._CF = 1
         self._ZF = 1
 
-        len = ((grLo - grHi) & 0x07) + 1
-        for gr in range(grHi, grHi + len):
-            grD = page + (gr & 0x07)
-
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        for grD in regs:
+            self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-            self._GR[self._CB][grD] -= self._CF
-            self._ZF &= self._GR[self._CB][grD] == 0
-            self._CF = self._GR[self._CB][grD] < 0
-            self._GR[self._CB][grD] &= 0xF
+            value = GR[grD] - self._CF
+            self._ZF &= value == 0
+            self._CF = value < 0
+            GR[grD] = value & 0xF
 
         self._PC += 1
 
-        return 1 * len
+        return len(regs)
 
-    def _decb(self, opcode):
-        grHi = (opcode >> 5) & 0x1F
-        grLo = opcode & 0x07
-        page = grHi & 0xF8
+    def _decb(self, regs):
+        GR = self._cbGR
 
         self._CF = 1
         self._ZF = 1
 
-        len = ((grLo - grHi) & 0x07) + 1
-        for gr in range(grHi, grHi + len):
-            grD = page + (gr & 0x07)
-
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        for grD in regs:
+            self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-            self._GR[self._CB][grD] -= self._CF
-            self._ZF &= self._GR[self._CB][grD] == 0
-            self._CF = self._GR[self._CB][grD] < 0
-            self._GR[self._CB][grD] -= 6 * self._CF
-            self._GR[self._CB][grD] &= 0xF
+            value = GR[grD] - self._CF
+            self._ZF &= value == 0
+            self._CF = value < 0
+            GR[grD] = (value - 6 * self._CF) & 0xF
 
         self._PC += 1
 
-        return 1 * len
+        return len(regs)
 
-    def _rshm(self, opcode):
-        grHi = (opcode >> 5) & 0x1F
-        grLo = opcode & 0x07
-        page = grHi & 0xF8
+    def _rshm(self, pairs, grHi):
+        GR = self._cbGR
 
-        len = ((grLo - grHi) & 0x07)
-        for gr in range(grHi + len, grHi, -1):
-            grS = page + ((gr - 1) & 0x07)
-            grD = page + (gr & 0x07)
+        for grD, grS in pairs:
+            self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
-
-            self._GR[self._CB][grD] = self._GR[self._CB][grS]
+            GR[grD] = GR[grS]
         
-        self._GR[self._CB][grHi] = 0
+        GR[grHi] = 0
         self._PC += 1
 
-        return 1 * len
-
-    def _lshm(self, opcode):
-        grLo = (opcode >> 5) & 0x1F
-        grHi = opcode & 0x07
-        page = grLo & 0xF8
+        return len(pairs)
 
-        len = ((grLo - grHi) & 0x07)
-        for gr in range(grHi, grHi + len):
-            grD = page + (gr & 0x07)
-            grS = page + ((gr + 1) & 0x07)
+    def _lshm(self, pairs, grLo):
+        GR = self._cbGR
 
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        for grD, grS in pairs:
+            self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-            self._GR[self._CB][grD] = self._GR[self._CB][grS]
+            GR[grD] = GR[grS]
        
-        self._GR[self._CB][grLo] = 0
+        GR[grLo] = 0
         self._PC += 1
         
-        return 1 * len
+        return len(pairs)
 
-    def _in(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        srS = opcode & 0x0F
+    def _in(self, grD, srS):
+        GR = self._cbGR
 
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-        self._GR[self._CB][grD] = self.srRead(srS)
+        GR[grD] = self.srRead(srS)
         self._PC += 1
 
         return 1
 
-    def _out(self, opcode):
-        srD = opcode & 0x0F
-        grS = (opcode >> 5) & 0x1F
+    def _out(self, grS, srD):
+        GR = self._cbGR
 
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grS] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[grS] << 8)
 
-        self._srWrite[srD](self, self._GR[self._CB][grS])
+        self._srWrite[srD](self, GR[grS])
         self._PC += 1
 
         return 1
 
-    def _outi(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
-
-        srD = opcode & 0x0F
-        imd = (opcode >> 6) & 0x0F
+    def _outi(self, grD, srD, imd):
+        self._bSA = (self._bSA >> 4) | (self._cbGR[grD] << 8)
 
         self._srWrite[srD](self, imd)
         self._PC += 1
 
         return 1
 
-    def _psam(self, opcode):
-        grLo = (opcode >> 5) & 0x1F
-        page = grLo & 0x18
-        grHi = page | (opcode & 0x07)
+    def _psam(self, regs):
+        GR = self._cbGR
 
-        len = ((grHi - grLo) & 0x07) + 1
-        for gr in range(grLo, grLo + len):
-            grS = page + (gr & 0x07)
-
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grS] << 8)
+        for grS in regs:
+            self._bSA = (self._bSA >> 4) | (GR[grS] << 8)
  
         self._memory.setSA(self._bSA)
         self._PC += 1
 
-        return 1 * len
+        return len(regs)
 
-    def _plam(self, opcode):
-        grLo = (opcode >> 5) & 0x1F
-        grHi = (grLo & 0x18) | (opcode & 0x07)
-        page = grLo & 0xF8
+    def _plam(self, regs):
+        GR = self._cbGR
 
         LA = 0
-        len = ((grHi - grLo) & 0x07) + 1
-        for gr in range(grLo, grLo + len):
-            grS = page + (gr & 0x07)
+        for grS in regs:
+            self._bSA = (self._bSA >> 4) | (GR[grS] << 8)
 
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grS] << 8)
+            LA = (LA >> 4) | (GR[grS] << 4)
 
-            LA = (LA >> 4) | (self._GR[self._CB][grS] << 4)
-
-        if (len > 1):
+        if (len(regs) > 1):
             self._display.setLA(LA)
 
         self._PC += 1
 
-        return 1 * len
-
-    def _ldsm(self, opcode):    
-        grHi = (opcode >> 5) & 0x1F
-        grLo = (grHi & 0x18) | (opcode & 0x07)
-        page = grHi & 0xF8
+        return len(regs)
 
-        self._GR[self._CB][grHi] = self._memory.readNibbleExternal()
+    def _ldsm(self, grHi, regs, cycles):
+        GR = self._cbGR
 
-        len = ((grLo - grHi) & 0x07) + 1
-        for gr in range(grHi + 1, grHi + len):
-            grD = page + (gr & 0x07)
+        GR[grHi] = self._memory.readNibbleExternal()
 
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        for grD in regs:
+            self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-            self._GR[self._CB][grD] = (self._memory.readExternal() >> 4) & 0x0F
+            GR[grD] = (self._memory.readExternal() >> 4) & 0x0F
 
         self._PC += 1
 
-        return 1 * len
+        return cycles
 
-    def _stsm(self, opcode):
-        grHi = (opcode >> 5) & 0x1F
-        grLo = (grHi & 0x18) | (opcode & 0x07)
-        page = grHi & 0xF8
+    def _stsm(self, pairs, cycles):
+        GR = self._cbGR
         
-        len = ((grLo - grHi) & 0x07) + 1
-        for gr in range(grHi + 1, grHi + len):
-            grS = page + (gr & 0x07)
-            grP = page + ((gr - 1) & 0x07)
-
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grS] << 8)
+        for grS, grP in pairs:
+            self._bSA = (self._bSA >> 4) | (GR[grS] << 8)
             
-            self._memory.writeExternal((self._GR[self._CB][grS] << 4) | (self._GR[self._CB][grP] & 0x0F))
+            self._memory.writeExternal((GR[grS] << 4) | (GR[grP] & 0x0F))
 
         self._PC += 1
 
-        return 1 * len
+        return cycles
 
-    def _stlm(self, opcode):
-        grHi = (opcode >> 5) & 0x1F
-        grLo = (grHi & 0x18) | (opcode & 0x07)
-        page = grHi & 0xF8
+    def _stlm(self, pairs, cycles):
+        GR = self._cbGR
         
-        len = ((grLo - grHi) & 0x07) + 1
-        for gr in range(grHi + 1, grHi + len):
-            grS = page + (gr & 0x07)
-            grP = page + ((gr - 1) & 0x07)
-
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grS] << 8)
+        for grS, grP in pairs:
+            self._bSA = (self._bSA >> 4) | (GR[grS] << 8)
             
-            self._display.writeDDRAM((self._GR[self._CB][grS] << 4) | (self._GR[self._CB][grP] & 0x0F))
+            self._display.writeDDRAM((GR[grS] << 4) | (GR[grP] & 0x0F))
 
         self._PC += 1
 
-        return 1 * len
+        return cycles
 
-    def _stl(self, opcode):
-        grS = (opcode >> 5) & 0x1F
+    def _stl(self, grS):
+        GR = self._cbGR
 
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grS] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[grS] << 8)
 
-        self._display.writeDDRAM(self._GR[self._CB][grS] | 0x30)
+        self._display.writeDDRAM(GR[grS] | 0x30)
         self._PC += 1
 
         return 1
 
-    def _psai(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+    def _psai(self, grD, imd):
+        self._bSA = (self._bSA >> 4) | (self._cbGR[grD] << 8)
 
-        self._memory.setSA(opcode)
+        self._memory.setSA(imd)
         self._PC += 1
 
         return 1
 
-    def _plai(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+    def _plai(self, grD, imd):
+        self._bSA = (self._bSA >> 4) | (self._cbGR[grD] << 8)
 
-        self._display.setLA(((opcode >> 2) & 0xF8) | (opcode & 0x07))
+        self._display.setLA(imd)
         self._PC += 1
 
         return 1
 
-    def _stls(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+    def _stls(self, grD):
+        self._bSA = (self._bSA >> 4) | (self._cbGR[grD] << 8)
 
         self._display.writeDDRAM(self._memory.readExternal())
         self._PC += 1
 
         return 1
 
-    def _stlsa(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
-
-        imd = ((opcode >> 2) & 0xF8) | (opcode & 0x07)
+    def _stlsa(self, grD, imd):
+        self._bSA = (self._bSA >> 4) | (self._cbGR[grD] << 8)
 
         self._display.writeDDRAMaddr(imd, self._memory.readExternal())
         self._PC += 1
 
         return 1
 
-    def _stli(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+    def _stli(self, grD, imd):
+        self._bSA = (self._bSA >> 4) | (self._cbGR[grD] << 8)
 
-        imd = ((opcode >> 2) & 0xF8) | (opcode & 0x07)
         self._display.writeDDRAM(imd)
         self._PC += 1
 
         return 1
 
-    def _stlia(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+    def _stlia(self, grD, imd):
+        self._bSA = (self._bSA >> 4) | (self._cbGR[grD] << 8)
 
-        imd = ((opcode >> 2) & 0xF8) | (opcode & 0x07)
         self._display.writeDDRAMaddr(imd, imd)
         self._PC += 1
 
         return 1
 
-    def _mov(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        grS = opcode & 0x1F
+    def _mov(self, grD, grS):
+        GR = self._cbGR
 
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-        self._GR[self._CB][grD] = self._GR[self._CB][grS]
+        GR[grD] = GR[grS]
         self._PC += 1
 
         return 1
 
-    def _movm(self, opcode):
-        grHi = (opcode >> 5) & 0x1F
-        grLo = (opcode & 0x1F)
-        pageF = grHi & 0xF8
-        pageL = grLo & 0xF8
+    def _movm(self, pairs):
+        GR = self._cbGR
 
-        len = ((grLo - grHi) & 0x07) + 1
-        for gr in range(grHi, grHi + len):
-            grD = pageF + (gr & 0x07)
-            grS = pageL + (gr & 0x07)
-    
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        for grD, grS in pairs:
+            self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-            self._GR[self._CB][grD] = self._GR[self._CB][grS]
+            GR[grD] = GR[grS]
 
         self._PC += 1
 
-        return 1 * len
+        return len(pairs)
 
-    def _ldi(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        imd = (opcode >> 1) & 0x0F
+    def _ldi(self, grD, imd):
+        GR = self._cbGR
             
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-        self._GR[self._CB][grD] = imd
+        GR[grD] = imd
         self._PC += 1
 
         return 1
 
-    def _clrm(self, opcode):
-        grHi = (opcode >> 5) & 0x1F
-        grLo = (opcode & 0x1F)
-        page = grHi & 0xF8
+    def _clrm(self, regs):
+        GR = self._cbGR
 
-        len = ((grLo - grHi) & 0x07) + 1
-        for gr in range(grHi, grHi + len):
-            grD = page + (gr & 0x07)
-                
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        for grD in regs:
+            self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-            self._GR[self._CB][grD] = 0
+            GR[grD] = 0
 
         self._PC += 1
 
-        return 1 * len
-
-    def _mvac(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        grS = opcode & 0x1F
+        return len(regs)
 
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+    def _mvac(self, grD, grS):
+        self._bSA = (self._bSA >> 4) | (self._cbGR[grD] << 8)
 
-        self._GR[self._AB][grD] = self._GR[self._CB][grS]
+        self._abGR[grD] = self._cbGR[grS]
         self._PC += 1
 
         return 1
 
-    def _mvacm(self, opcode):
-        grHi = (opcode >> 5) & 0x1F
-        grLo = (opcode & 0x1F)
-        pageF = grHi & 0xF8
-        pageL = grLo & 0xF8
-
-        len = ((grLo - grHi) & 0x07) + 1
-        for gr in range(grHi, grHi + len):
-            grD = pageF + (gr & 0x07)
-            grS = pageL + (gr & 0x07)
+    def _mvacm(self, pairs):
+        GR = self._cbGR
+        AR = self._abGR
 
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+        for grD, grS in pairs:
+            self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-            self._GR[self._AB][grD] = self._GR[self._CB][grS]
+            AR[grD] = GR[grS]
 
         self._PC += 1
 
-        return 1 * len
+        return len(pairs)
 
-    def _mvca(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        grS = opcode & 0x1F
+    def _mvca(self, grD, grS):
+        self._bSA = (self._bSA >> 4) | (self._cbGR[grD] << 8)
 
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
-
-        self._GR[self._CB][grD] = self._GR[self._AB][grS]
+        self._cbGR[grD] = self._abGR[grS]
         self._PC += 1
 
         return 1
 
-    def _mvcam(self, opcode):
-        grHi = (opcode >> 5) & 0x1F
-        grLo = (opcode & 0x1F)
-        pageF = grHi & 0xF8
-        pageL = grLo & 0xF8
+    def _mvcam(self, pairs):
+        GR = self._cbGR
+        AR = self._abGR
 
-        len = ((grLo - grHi) & 0x07) + 1
-        for gr in range(grHi, grHi + len):
-            grD = pageF + (gr & 0x07)
-            grS = pageL + (gr & 0x07)
+        for grD, grS in pairs:
+            self._bSA = (self._bSA >> 4) | (GR[grD] << 8)
 
-            self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
-
-            self._GR[self._CB][grD] = self._GR[self._AB][grS]
+            GR[grD] = AR[grS]
 
         self._PC += 1
 
-        return 1 * len
+        return len(pairs)
 
-    def _call(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+    def _call(self, grD, imd):
+        self._bSA = (self._bSA >> 4) | (self._cbGR[grD] << 8)
 
-        imd = (opcode & 0xFFF)
         self._STACK.append(self._PC)
         if (len(self._STACK) > STACK_SIZE):
             self._STACK.pop(0)
@@ -1084,9 +1166,8 @@ class CPU():
 
         return 1
 
-    def _ret(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+    def _ret(self, grD):
+        self._bSA = (self._bSA >> 4) | (self._cbGR[grD] << 8)
 
         if (len(self._STACK) > 0):
             self._PC = self._STACK.pop()
@@ -1094,108 +1175,97 @@ class CPU():
 
         return 1
 
-    def _cpfjr(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+    def _cpfjr(self, gr, imd):
+        GR = self._cbGR
+
+        self._bSA = (self._bSA >> 4) | (GR[gr] << 8)
 
-        imd = opcode & 0x1F
-        gr = (opcode >> 5) & 0x1F
-        if (self._GR[self._CB][gr] == 4): self._PC += imd
+        if (GR[gr] == 4): self._PC += imd
         self._PC += 1
 
         return 1
 
-    def _ijmr(self, opcode):
-        gr = (opcode >> 5) & 0x1F
+    def _ijmr(self, gr):
+        GR = self._cbGR
 
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][gr] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[gr] << 8)
 
-        self._PC += self._GR[self._CB][gr]
+        self._PC += GR[gr]
         self._PC += 1
 
         return 1
 
-    def _wfe(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+    def _wfe(self, grD):
+        self._bSA = (self._bSA >> 4) | (self._cbGR[grD] << 8)
 
         if (self._SR[0] != 0):
             self._PC += 1
 
         return 1
 
-    def _jmp(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+    def _jmp(self, grD, imd):
+        self._bSA = (self._bSA >> 4) | (self._cbGR[grD] << 8)
         
-        self._PC = opcode & 0xFFF
+        self._PC = imd
 
         return 1
 
-    def _jz(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+    def _jz(self, grD, imd):
+        self._bSA = (self._bSA >> 4) | (self._cbGR[grD] << 8)
 
         if (self._ZF):
-            self._PC = ((opcode & 0x03FF) | (0xC00 & self._PC))
+            self._PC = (imd | (0xC00 & self._PC))
         else: 
             self._PC += 1
 
         return 1
 
-    def _jnz(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+    def _jnz(self, grD, imd):
+        self._bSA = (self._bSA >> 4) | (self._cbGR[grD] << 8)
 
         if (not self._ZF):
-            self._PC = ((opcode & 0x03FF) | (0xC00 & self._PC))
+            self._PC = (imd | (0xC00 & self._PC))
         else:
             self._PC += 1
 
         return 1
 
-    def _jc(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+    def _jc(self, grD, imd):
+        self._bSA = (self._bSA >> 4) | (self._cbGR[grD] << 8)
 
         if (self._CF):
-            self._PC = ((opcode & 0x03FF) | (0xC00 & self._PC))
+            self._PC = (imd | (0xC00 & self._PC))
         else:
             self._PC += 1
 
         return 1
 
-    def _jnc(self, opcode):
-        grD = (opcode >> 5) & 0x1F
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][grD] << 8)
+    def _jnc(self, grD, imd):
+        self._bSA = (self._bSA >> 4) | (self._cbGR[grD] << 8)
 
         if (not self._CF):
-            self._PC = ((opcode & 0x03FF) | (0xC00 & self._PC))
+            self._PC = (imd | (0xC00 & self._PC))
         else:
             self._PC += 1
 
         return 1
 
-    def _btjr(self, opcode):
-        imd = opcode & 0x1F
-        gr = (opcode >> 5) & 0x1F
-        cmp = (opcode >> 10) & 0x03
+    def _btjr(self, gr, mask, imd):
+        GR = self._cbGR
 
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][gr] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[gr] << 8)
 
-        if (self._GR[self._CB][gr] & (1 << cmp)): self._PC += imd
+        if (GR[gr] & mask): self._PC += imd
         self._PC += 1
 
         return 1
 
-    def _cpjr(self, opcode):
-        imd = opcode & 0x1F
-        gr = (opcode >> 5) & 0x1F
-        cmp = (opcode >> 10) & 0x03
+    def _cpjr(self, gr, cmp, imd):
+        GR = self._cbGR
 
-        self._bSA = (self._bSA >> 4) | (self._GR[self._CB][gr] << 8)
+        self._bSA = (self._bSA >> 4) | (GR[gr] << 8)
 
-        if (self._GR[self._CB][gr] == cmp): self._PC += imd
+        if (GR[gr] == cmp): self._PC += imd
         self._PC += 1
 
         return 1
@@ -1223,12 +1293,12 @@ class CPU():
     def _sr3Write(self, value):
         self._ispMode = value & b0
         self._ispTransmitEnable = (value & b1) > 0
-        return
+        self._scheduleIsp()
 
     def _sr4Write(self, value):
         self._ispReceiveEnable = (value & b1) > 0
         self._ispTransmit = (value & b0) > 0
-        return
+        self._scheduleIsp()
 
     def _sr5Write(self, value):
         self._ispTransmitBuffer = (self._ispTransmitBuffer & 0x0F) | (value << 4)
@@ -10,6 +10,9 @@ SR_STR = [
     'SR8', 'SR9', 'SR10', 'SR11', 'SR12', 'SR13', 'SR14', 'SR15',
 ]
 
+#updates longer than this read the whole image at once instead of word by word
+BULK_SIZE = 256
+
 class Disassembler():
 
     def __init__(self):
@@ -90,18 +93,49 @@ class Disassembler():
         self._0x60 = (Disassembler._psam, Disassembler._plam)
         self._0x64 = (Disassembler._stsm, Disassembler._ldsm)
 
+        #text of every opcode seen, or (prefix, offset, relative) when the jump target depends on the PC
+        self._texts = {}
+        self._relative = (Disassembler._cpfjr, Disassembler._btjr, Disassembler._cpjr)
+        self._paged = (Disassembler._jz, Disassembler._jnz, Disassembler._jc, Disassembler._jnc)
+
     def disassemble(self, memory):
         pcList = memory.getUpdated()
         if (len(pcList) > 0):
             instructions = {"LISTING": {}}
-            for pc in pcList:
-                opcode = memory.getOpcode(pc)
-                instructions["LISTING"][pc] = [opcode, self._instructions[opcode >> 10](self, opcode, pc)]
+            listing = instructions["LISTING"]
+            if (len(pcList) > BULK_SIZE):
+                opcodes = memory.getOpcodes()
+                for pc in pcList:
+                    opcode = opcodes[pc & 0xFFF]
+                    listing[pc] = [opcode, self.text(opcode, pc)]
+            else:
+                for pc in pcList:
+                    opcode = memory.getOpcode(pc)
+                    listing[pc] = [opcode, self.text(opcode, pc)]
 
             return instructions
         else:
             return {}
 
+    def text(self, opcode, pc):
+        entry = self._texts.get(opcode)
+        if (entry == None):
+            entry = self._memoize(opcode)
+        if (isinstance(entry, str)):
+            return entry
+        prefix, offset, relative = entry
+        return prefix + self._lblbase % ((offset + pc + 1) if (relative) else (offset | (0xC00 & pc)))
+
+    def _memoize(self, opcode):
+        handler = self._instructions[opcode >> 10]
+        entry = handler(self, opcode, 0)
+        if (handler in self._relative):
+            entry = (entry[:entry.rindex(' ') + 1], opcode & 0x1F, True)
+        elif (handler in self._paged):
+            entry = (entry[:entry.rindex(' ') + 1], opcode & 0x03FF, False)
+        self._texts[opcode] = entry
+        return entry
+
     def _op0x3C(self, opcode, pc):
         adOp = (opcode >> 9) & 0x01
         return self._0x3C[adOp](self, opcode, pc)
@@ -1,5 +1,10 @@
 from charset import CHARSET
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 CHAR_COUNT_X = 10
 CHAR_COUNT_Y = 4
 CHAR_COUNT = CHAR_COUNT_Y * CHAR_COUNT_X
@@ -16,20 +21,73 @@ DCTRL_OFFSET = 112
 
 DCTRL_COUNT = 16
 
+ROWS_MASK = (1 << DOT_COUNT_Y) - 1
+
+#[reflectX, reflectY] for each half and control register value
+REFLECTS = ((0, 0), (4, 0), (4, 6), (0, 6))
+TOP_REFLECTS = (0, 1, 2, 2)
+BOTTOM_REFLECTS = (2, 3, 0, 0)
+
+#the framebuffer is 1 bit per pixel, each screen line padded to whole bytes, leftmost pixel in the MSB
+ROW_BYTES = (SCR_WIDTH + 7) // 8
+ROW_BITS = ROW_BYTES * 8
+CELL_SHIFTS = tuple(ROW_BITS - (charX + 1) * DOT_COUNT_X for charX in range(CHAR_COUNT_X))
+CELL_CLEAR = tuple(~(((1 << DOT_COUNT_X) - 1) << shift) for shift in CELL_SHIFTS)
+FILLED = (((1 << SCR_WIDTH) - 1) << (ROW_BITS - SCR_WIDTH)).to_bytes(ROW_BYTES, "big") * SCR_HEIGHT
+
+def _rowMask(row, reflectX):
+    mask = 0
+    for dotX in range(DOT_COUNT_X):
+        mask = (mask << 1) | row[abs(reflectX - dotX)]
+    return mask
+
+#GLYPH_ROWS[reflect][code][dotY] is the 5-bit row mask of screen line dotY of a character cell, leftmost pixel in bit 4
+GLYPH_ROWS = tuple(
+    tuple(tuple(_rowMask(char[abs(reflectY - dotY)], reflectX) for dotY in range(DOT_COUNT_Y)) for char in CHARSET)
+    for reflectX, reflectY in REFLECTS
+)
+
+#CHARSET as a [code][dotY][dotX] array for the vectorized renderer
+ATLAS = numpy.array(CHARSET, dtype = numpy.uint8) if (numpy != None) else None
+
+#DIRECT_ROWS[reflected][value] is the row mask of a direct-draw byte
+DIRECT_ROWS = tuple(
+    tuple(_rowMask([(value >> dotX) & 0x01 for dotX in range(DOT_COUNT_X)], reflectX) for value in range(256))
+    for reflectX in (0, DOT_COUNT_X - 1)
+)
+
+#LCD persistence, a dot keeps PERSISTENCE_DECAY of its distance to the driven level every PERSISTENCE_MCYCLES (1/60 s of emulated time)
+PERSISTENCE_DECAY = 0.65
+PERSISTENCE_MCYCLES = 32768 / 8 / 60
+
+def pixelRows(frame):
+    #one int of SCR_WIDTH bits per line of packed frame rows, leftmost pixel in the MSB
+    return [int.from_bytes(frame[y * ROW_BYTES:(y + 1) * ROW_BYTES], "big") >> (ROW_BITS - SCR_WIDTH) for y in range(len(frame) // ROW_BYTES)]
+
 class Display():
+    __slots__ = (
+        "_DDRAM", "_DARAM", "_DCTRL", "_pixels", "_blinkChar", "_LA", "_contrast", "_pixelOpacity",
+        "_counter", "_scancharCounter", "_reflects", "_resetScenchar", "_storeCR", "_dirty", "_dirtyRows", "_frame",
+        "_version"
+    )
+
     def __init__(self):
-        self._DDRAM = [0] * CHAR_COUNT
-        self._DARAM = [0] * CHAR_COUNT
-        self._DCTRL = [0] * DCTRL_COUNT
-        self._pixels = [0] * (SCR_WIDTH * SCR_HEIGHT)
+        self._DDRAM = bytearray(CHAR_COUNT)
+        self._DARAM = bytearray(CHAR_COUNT)
+        self._DCTRL = bytearray(DCTRL_COUNT)
+        self._pixels = bytearray(ROW_BYTES * SCR_HEIGHT)
+        self._frame = memoryview(self._pixels).toreadonly()
+        self._version = 0
         self._blinkChar = 0
         self._LA = 0
         self._contrast = 16
         self._pixelOpacity = [0, 0]
         self._counter = 0
         self._scancharCounter = 0
-        self._reflects = [[0, 0], [0, 0]]
+        self._reflects = [0, 0]
         self._resetScenchar = False
+        self._dirty = bytearray([ROWS_MASK]) * CHAR_COUNT
+        self._dirtyRows = CHAR_COUNT * DOT_COUNT_Y
         self._setPixelOpacity()
         self._storeCR = (
             Display._setCtrlRegTopHalf,
@@ -50,27 +108,43 @@ class Display():
             Display._setCtrlRegResetScanline
         )
 
+    def _markDirty(self, charPos, rows):
+        rows &= ~self._dirty[charPos]
+        if (rows):
+            self._dirty[charPos] |= rows
+            self._dirtyRows += bin(rows).count("1")
+
+    def _markAllDirty(self, first = 0, last = CHAR_COUNT):
+        for charPos in range(first, last):
+            self._markDirty(charPos, ROWS_MASK)
+
     def _updateBlinkChar(self):
         if (self._blinkChar):
             self._blinkChar = 0
         else:
             self._blinkChar = 255 if (self._DCTRL[0x5]) else 32
+        for charPos, blink in enumerate(self._DARAM):
+            if (blink):
+                self._markDirty(charPos, ROWS_MASK)
                         
     def _directDraw(self, counter, value):    
         dotY = (counter >> 4) & 0x07
         charX = counter & 0x0F
         if ((charX < CHAR_COUNT_X) and (dotY < DOT_COUNT_Y)):
             charY = (counter >> 7) & 0x03
-            reflect = 0
+            reflected = 0
             if (charY > 1):
                 charY ^= 1
                 dotY = DOT_COUNT_Y - 1 - dotY
                 charX = CHAR_COUNT_X - 1 - charX
-                reflect = DOT_COUNT_X - 1
-            offsetY = (charY * DOT_COUNT_Y + dotY) * SCR_WIDTH
-            for dotX in range(DOT_COUNT_X):
-                self._pixels[offsetY + charX * DOT_COUNT_X + abs(reflect - dotX)] = value & 0x01
-                value >>= 1
+                reflected = 1
+            offset = (charY * DOT_COUNT_Y + dotY) * ROW_BYTES
+            line = int.from_bytes(self._pixels[offset:offset + ROW_BYTES], "big")
+            drawn = (line & CELL_CLEAR[charX]) | (DIRECT_ROWS[reflected][value & 0xFF] << CELL_SHIFTS[charX])
+            if (drawn != line):
+                self._pixels[offset:offset + ROW_BYTES] = drawn.to_bytes(ROW_BYTES, "big")
+                self._version += 1
+            self._markDirty(charY * CHAR_COUNT_X + charX, 1 << dotY)
 
     def _drawScenline(self, counter):
         dotY = (counter >> 4) & 0x07
@@ -82,17 +156,27 @@ class Display():
                 charY ^= 1
                 dotY = 6 - dotY
                 startCharX, stopCharX = CHAR_COUNT_X - stopCharX, CHAR_COUNT_X - startCharX
-            reflect = self._reflects[charY >> 1]
-            offsetY = (charY * DOT_COUNT_Y + dotY) * SCR_WIDTH
+            glyphRows = GLYPH_ROWS[self._reflects[charY >> 1]]
+            offset = (charY * DOT_COUNT_Y + dotY) * ROW_BYTES
             pixels = self._pixels
+            line = int.from_bytes(pixels[offset:offset + ROW_BYTES], "big")
+            drawn = line
+            dirty = self._dirty
+            row = 1 << dotY
             for charX in range(startCharX, stopCharX):
                 charPos = charY * CHAR_COUNT_X + charX
+                if (not (dirty[charPos] & row)):
+                    continue
+                dirty[charPos] ^= row
+                self._dirtyRows -= 1
                 if (self._DARAM[charPos] and self._blinkChar):
-                    char = CHARSET[self._blinkChar][abs(reflect[1] - dotY)]
+                    mask = glyphRows[self._blinkChar][dotY]
                 else:
-                    char = CHARSET[self._DDRAM[charPos]][abs(reflect[1] - dotY)]
-                for dotX in range(DOT_COUNT_X):
-                    pixels[offsetY + charX * DOT_COUNT_X + dotX] = char[abs(reflect[0] - dotX)]
+                    mask = glyphRows[self._DDRAM[charPos]][dotY]
+                drawn = (drawn & CELL_CLEAR[charX]) | (mask << CELL_SHIFTS[charX])
+            if (drawn != line):
+                pixels[offset:offset + ROW_BYTES] = drawn.to_bytes(ROW_BYTES, "big")
+                self._version += 1
 
     def _setPixelOpacity(self):       
         self._pixelOpacity[0] = max((self._contrast - 15) * 6, 0) / 255
@@ -100,27 +184,21 @@ class Display():
 
     def _setCtrlRegTopHalf(self, value):
         self._DCTRL[0x0] = value & 0x03
-        if ((value & 0x03) == 0):
-            self._reflects[0] = [0, 0]
-        elif ((value & 0x03) == 1):
-            self._reflects[0] = [4, 0]
-        else:
-            self._reflects[0] = [4, 6]
+        if (self._reflects[0] != TOP_REFLECTS[value & 0x03]):
+            self._reflects[0] = TOP_REFLECTS[value & 0x03]
+            self._markAllDirty(0, CHAR_COUNT // 2)
 
     def _setCtrlRegBottomHalf(self, value):
         self._DCTRL[0x1] = value & 0x03
-        if ((value & 0x03) == 0):
-            self._reflects[1] = [4, 6]
-        elif ((value & 0x03) == 1):
-            self._reflects[1] = [0, 6]
-        else:
-            self._reflects[1] = [0, 0]
+        if (self._reflects[1] != BOTTOM_REFLECTS[value & 0x03]):
+            self._reflects[1] = BOTTOM_REFLECTS[value & 0x03]
+            self._markAllDirty(CHAR_COUNT // 2, CHAR_COUNT)
 
     def _setCtrlRegUndefined0x71(self, value):
-        self._DCTRL[0x2] = value
+        self._DCTRL[0x2] = value & 0xFF
     
     def _setCtrlRegUndefined0x72(self, value):
-        self._DCTRL[0x3] = value
+        self._DCTRL[0x3] = value & 0xFF
 
     def _setCtrlRegScanStop(self, value):
         self._DCTRL[0x4] = value & 0x01
@@ -131,7 +209,9 @@ class Display():
     def _setCtrlRegTestFill(self, value):
         self._DCTRL[0x6] = value & 0x01
         if (value & 0x01):
-            self._pixels = [1] * (SCR_WIDTH * SCR_HEIGHT)
+            self._pixels[:] = FILLED
+            self._version += 1
+            self._markAllDirty()
             self._pixelOpacity[1] = 1
         else:
             self._setPixelOpacity()
@@ -154,17 +234,19 @@ class Display():
 
     def _setCtrlRegClearCharRegs(self, value):
         #to-do clearing is stop after switching to direct mode?
-        self._DDRAM = [0] * CHAR_COUNT
+        self._DDRAM = bytearray(CHAR_COUNT)
+        self._markAllDirty()
 
     def _setCtrlRegForceRedraw(self, value):
         self._DCTRL[0xC] = 1
         self._scancharCounter &= 0x1FF
     
     def _setCtrlRegBlinkRegs(self, value):
-        self._DARAM = [0] * CHAR_COUNT
+        self._DARAM = bytearray(CHAR_COUNT)
+        self._markAllDirty()
 
     def _setCtrlRegClearCtrlRegs(self, value):
-        self._DCTRL = [0] * DCTRL_COUNT
+        self._DCTRL = bytearray(DCTRL_COUNT)
 
     def _setCtrlRegResetScanline(self, value):
         self._scancharCounter = 0
@@ -187,9 +269,13 @@ class Display():
             self._scancharCounter += 1
             
         if (addr in range(DDRAM_OFFSET, DDRAM_OFFSET + CHAR_COUNT)):
-            self._DDRAM[addr] = value
+            if (self._DDRAM[addr] != value & 0xFF):
+                self._DDRAM[addr] = value & 0xFF
+                self._markDirty(addr, ROWS_MASK)
         elif (addr in range(DARAM_OFFSET, DARAM_OFFSET + CHAR_COUNT)):
-            self._DARAM[addr - DARAM_OFFSET] = value & 0x1
+            if (self._DARAM[addr - DARAM_OFFSET] != value & 0x1):
+                self._DARAM[addr - DARAM_OFFSET] = value & 0x1
+                self._markDirty(addr - DARAM_OFFSET, ROWS_MASK)
         elif (addr in range(DCTRL_OFFSET, DCTRL_OFFSET + 0xF + 1)):
             self._storeCR[addr - DCTRL_OFFSET](self, value)
 
@@ -206,7 +292,7 @@ class Display():
             self._updateBlinkChar()
 
         if (not DCTRL[0x7]):       
-            if ((not DCTRL[0x4]) and (not DCTRL[0x6]) and (self._scancharCounter < (32 * 16))):
+            if ((not DCTRL[0x4]) and (not DCTRL[0x6]) and (self._scancharCounter < (32 * 16)) and self._dirtyRows):
                 self._drawScenline(self._scancharCounter)
             self._scancharCounter += 4
             
@@ -216,6 +302,21 @@ class Display():
 
         self._counter += 1
 
+    def advance(self, cycles):
+        #same as calling clock() cycles times, skipping stretches where no scanline is drawn
+        DCTRL = self._DCTRL
+        while (cycles > 0):
+            if (DCTRL[0xC] or not (self._counter & 0x3FF) or
+                not (DCTRL[0x7] or DCTRL[0x4] or DCTRL[0x6] or self._scancharCounter >= (32 * 16) or not self._dirtyRows)):
+                self.clock()
+                cycles -= 1
+            else:
+                skip = min(cycles, 0x400 - (self._counter & 0x3FF))
+                if (not DCTRL[0x7]):
+                    self._scancharCounter += 4 * skip
+                self._counter += skip
+                cycles -= skip
+
     def setDDRAM(self, addr, value):
         self.writeDDRAMaddr(addr + DDRAM_OFFSET, value)
 
@@ -225,14 +326,114 @@ class Display():
     def setDCTRL(self, addr, value):
         self.writeDDRAMaddr(addr + DCTRL_OFFSET, value)
 
-    def getPixels(self):
-        opacity = self._pixelOpacity
-        return [opacity[pixel] for pixel in self._pixels]
+    def render(self):
+        #whole frame from the character registers as the scan would settle it, without scan timing
+        if (self._DCTRL[0x6]):
+            return FILLED
+        if (self._DCTRL[0x7]):
+            return bytes(self._pixels)
+        if (numpy == None):
+            return self._renderRows()
+
+        codes = numpy.frombuffer(self._DDRAM, dtype = numpy.uint8).copy()
+        if (self._blinkChar):
+            codes[numpy.frombuffer(self._DARAM, dtype = numpy.uint8) != 0] = self._blinkChar
+        glyphs = ATLAS[codes]
+        halves = []
+        for half, reflect in enumerate(self._reflects):
+            reflectX, reflectY = REFLECTS[reflect]
+            part = glyphs[half * CHAR_COUNT // 2:(half + 1) * CHAR_COUNT // 2]
+            if (reflectY):
+                part = part[:, ::-1]
+            if (reflectX):
+                part = part[:, :, ::-1]
+            halves.append(part)
+        frame = numpy.concatenate(halves).reshape(CHAR_COUNT_Y, CHAR_COUNT_X, DOT_COUNT_Y, DOT_COUNT_X)
+        return numpy.packbits(frame.transpose(0, 2, 1, 3).reshape(SCR_HEIGHT, SCR_WIDTH), axis = 1).tobytes()
+
+    def _renderRows(self):
+        rows = []
+        for charY in range(CHAR_COUNT_Y):
+            glyphRows = GLYPH_ROWS[self._reflects[charY >> 1]]
+            codes = []
+            for charPos in range(charY * CHAR_COUNT_X, (charY + 1) * CHAR_COUNT_X):
+                codes.append(self._blinkChar if (self._DARAM[charPos] and self._blinkChar) else self._DDRAM[charPos])
+            for dotY in range(DOT_COUNT_Y):
+                line = 0
+                for code in codes:
+                    line = (line << DOT_COUNT_X) | glyphRows[code][dotY]
+                rows.append((line << (ROW_BITS - SCR_WIDTH)).to_bytes(ROW_BYTES, "big"))
+        return b"".join(rows)
+
+    def frame(self):
+        #read-only view of the packed framebuffer, it changes as the display is clocked
+        return self._frame
+
+    def version(self):
+        #bumped whenever a framebuffer line changes
+        return self._version
+
+    def pixelOpacity(self):
+        return tuple(self._pixelOpacity)
         
-    def examine(self):
-        return {
-            "DDRAM": {i : value for i, value in enumerate(self._DDRAM)},
-            "DARAM": {i : value for i, value in enumerate(self._DARAM)},
-            "DCTRL": {i : value for i, value in enumerate(self._DCTRL)},
-            "LA": self._LA
-        }
\ No newline at end of file
+    def snapshot(self):
+        return (bytes(self._DDRAM), bytes(self._DARAM), bytes(self._DCTRL), self._LA)
+
+    def examine(self, snapshot = None, keys = None):
+        #DDRAM, DARAM and DCTRL entries and LA changed since snapshot, keys picks which are gathered
+        DDRAM, DARAM, DCTRL, LA = snapshot if (snapshot != None) else (None,) * 4
+        info = {}
+        for name, old, values in zip(("DDRAM", "DARAM", "DCTRL"), (DDRAM, DARAM, DCTRL), (self._DDRAM, self._DARAM, self._DCTRL)):
+            if ((keys == None or name in keys) and old != values):
+                info[name] = {i : value for i, value in enumerate(values) if old == None or value != old[i]}
+        if ((keys == None or "LA" in keys) and LA != self._LA):
+            info["LA"] = self._LA
+        return info
+
+class Persistence():
+    #per dot opacity levels fading towards the driven frame as emulated time passes
+    __slots__ = ("_levels", "_settled")
+
+    def __init__(self):
+        self._settled = False
+        if (numpy != None):
+            self._levels = numpy.zeros((SCR_HEIGHT, SCR_WIDTH))
+        else:
+            self._levels = [0.0] * (SCR_HEIGHT * SCR_WIDTH)
+
+    def advance(self, frame, opacity, mcycles = None):
+        #mcycles = None settles every dot on the frame at once
+        keep = PERSISTENCE_DECAY ** (mcycles / PERSISTENCE_MCYCLES) if (mcycles != None) else 0
+        offOpacity, onOpacity = opacity
+        if (numpy != None):
+            bits = numpy.unpackbits(numpy.frombuffer(frame, dtype = numpy.uint8).reshape(SCR_HEIGHT, ROW_BYTES), axis = 1)[:, :SCR_WIDTH]
+            targets = numpy.where(bits, onOpacity, offOpacity)
+            self._levels = targets + (self._levels - targets) * keep
+            settled = numpy.abs(self._levels - targets) < 1 / 255
+            self._levels[settled] = targets[settled]
+            self._settled = bool(settled.all())
+            return
+
+        levels = self._levels
+        self._settled = True
+        i = 0
+        for row in pixelRows(frame):
+            for x in range(SCR_WIDTH - 1, -1, -1):
+                target = onOpacity if ((row >> x) & 0x01) else offOpacity
+                level = target + (levels[i] - target) * keep
+                if (abs(level - target) < 1 / 255):
+                    levels[i] = target
+                else:
+                    levels[i] = level
+                    self._settled = False
+                i += 1
+
+    def settled(self):
+        #True when every dot reached the level of the last frame, advancing on the same frame changes nothing
+        return self._settled
+
+    def alphas(self):
+        #one byte per dot, 0 to 255, SCR_WIDTH bytes per line
+        if (numpy != None):
+            return numpy.rint(self._levels * 255).astype(numpy.uint8).tobytes()
+        return bytes(round(level * 255) for level in self._levels)
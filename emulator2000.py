@@ -0,0 +1,176 @@
+import argparse
+import json
+import sys
+
+from analysis import analyze, CACHE_DIR
+from assembler import Assembler, AssemblerError, internalImage, externalImage
+from cpu import CPU
+from disassembler import Disassembler
+from display import Display, SCR_WIDTH, pixelRows
+from memory import Memory
+
+DOTS = str.maketrans("01", ".#")
+
+class NullBeeper():
+    def stop(self):
+        pass
+
+    def beep(self):
+        pass
+
+    def startTremolo(self):
+        pass
+
+    def stopTremolo(self):
+        pass
+
+class Machine():
+    def __init__(self, internalPath, externalPath, beeper = None, transmit = None, persistent = False):
+        self._beeper = beeper if (beeper != None) else NullBeeper()
+        self._transmitted = bytearray()
+        self._transmit = transmit if (transmit != None) else self._transmitted.append
+        self._memory = Memory(internalPath, externalPath, persistent)
+        self._display = Display()
+        self._CPU = CPU(self._memory, self._display, self._beeper, self._transmit)
+
+    def cpu(self):
+        return self._CPU
+
+    def memory(self):
+        return self._memory
+
+    def display(self):
+        return self._display
+
+    def transmitted(self):
+        return bytes(self._transmitted)
+
+    def run(self, mcycles, breakpoints = None):
+        return self._CPU.run(mcycles, breakpoints)
+
+    def run_until(self, mcycle, breakpoints = None):
+        #runs until the clocked cycle count (CPU.clocks(), not the instruction based CPU.mcycles()) reaches mcycle, returns the cycles run
+        return self._CPU.run(max(mcycle - self._CPU.clocks(), 0), breakpoints)
+
+    def btnPressed(self, keyCode):
+        self._CPU.btnPressed(keyCode)
+
+    def btnReleased(self, keyCode):
+        self._CPU.btnReleased(keyCode)
+
+    def receive(self, data):
+        self._CPU.ispReceive(data)
+
+    def frame(self, render = False):
+        frame = self._display.render() if (render) else self._display.frame()
+        return [format(row, "0%db" % SCR_WIDTH).translate(DOTS) for row in pixelRows(frame)]
+
+    def examine(self):
+        return {
+            **self._memory.examine(),
+            **self._CPU.examine(),
+            **self._display.examine(),
+            **{"MC": self._CPU.mcycles()}
+        }
+
+def _programWord(value):
+    pc = int(value, 0)
+    if (pc < 0 or pc > 0xFFF):
+        raise argparse.ArgumentTypeError("%s is not a program word address (0x000-0xFFF)" % value)
+    return pc
+
+def _positive(value):
+    count = int(value, 0)
+    if (count <= 0):
+        raise argparse.ArgumentTypeError("%s is not a positive number of cycles" % value)
+    return count
+
+def _run(args):
+    machine = Machine(args.rom, args.ext, persistent = args.persist)
+    breakpoints = {pc: True for pc in args.bp} if (args.bp) else None
+    every = args.every if (args.every) else args.cycles
+    done = 0
+    while (done < args.cycles):
+        ran = machine.run(min(every, args.cycles - done), breakpoints)
+        done += ran
+        if (args.frames):
+            print("\n".join(machine.frame(args.render)) + "\n")
+        if (breakpoints != None and machine.cpu().PC() in breakpoints):
+            break
+
+    machine.memory().flush()
+
+    if (args.state):
+        state = machine.examine()
+        state["ISPOUT"] = list(machine.transmitted())
+        print(json.dumps(state))
+    elif (not args.frames):
+        print("\n".join(machine.frame(args.render)))
+
+def _analyze(args):
+    memory = Memory(args.rom, args.ext)
+    analysis = analyze(memory.image(), args.entry if (args.entry) else (0,), None if (args.no_cache) else args.cache)
+    disassembler = Disassembler()
+    for start, (last, successors) in sorted(analysis.blocks.items()):
+        if (start in analysis.labels):
+            references = analysis.callers.get(start, []) + analysis.jumps.get(start, [])
+            print("\n%s:%s" % (analysis.labels[start], ("  ; from " + ", ".join("0x%0.3X" % pc for pc in sorted(references))) if (references) else ""))
+        for pc in range(start, last + 1):
+            print("    0x%0.3X: %s" % (pc, disassembler.text(memory.getOpcode(pc), pc)))
+    if (analysis.computed):
+        print("\ncomputed jumps: " + ", ".join("0x%0.3X" % pc for pc in analysis.computed))
+
+def _assemble(args):
+    with open(args.source, "r") as file:
+        source = file.read()
+    try:
+        image, written = Assembler().assemble(source)
+    except AssemblerError as e:
+        print("%s: %s" % (args.source, e))
+        return 1
+    if (args.rom):
+        with open(args.rom, "wb") as file:
+            file.write(internalImage(image))
+    if (args.ext):
+        with open(args.ext, "wb") as file:
+            file.write(externalImage(image, written))
+    return 0
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(
+        prog='emulator2000',
+        description='Emulator 2000, headless runner.'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help='Run a program at maximum speed')
+    run.add_argument('--rom', help='Internal ROM file')
+    run.add_argument('--ext', help='External memory file')
+    run.add_argument('--cycles', type=_positive, required=True, help='Machine cycles to run')
+    run.add_argument('--every', type=_positive, help='Dump a frame every N machine cycles (with --frames)')
+    run.add_argument('--frames', action='store_true', help='Dump display frames while running')
+    run.add_argument('--state', action='store_true', help='Dump the final state as JSON')
+    run.add_argument('--render', action='store_true', help='Dump frames rendered from the character registers instead of the scanned pixels')
+    run.add_argument('--persist', action='store_true', help='Save external memory changes back to the --ext file')
+    run.add_argument('--bp', nargs='+', type=lambda value: int(value, 0), help='Stop at any of these PC values')
+    analysis = commands.add_parser('analyze', help='List the reachable code with labels and cross-references')
+    analysis.add_argument('--rom', help='Internal ROM file')
+    analysis.add_argument('--ext', help='External memory file')
+    analysis.add_argument('--entry', nargs='+', type=_programWord, help='Entry points (default 0)')
+    analysis.add_argument('--cache', default=CACHE_DIR, help='Directory of cached analyses')
+    analysis.add_argument('--no-cache', action='store_true', help='Do not read or write cached analyses')
+    assemble = commands.add_parser('assemble', help='Assemble a source file into memory images')
+    assemble.add_argument('source', help='Assembly source, in the syntax of the disassembly listing')
+    assemble.add_argument('--rom', help='Write the internal ROM image (words 0x000-0xBFF) to this file')
+    assemble.add_argument('--ext', help='Write the external memory image (words from 0xC00) to this file')
+    args = parser.parse_args(argv)
+
+    if (args.command == 'run'):
+        _run(args)
+    elif (args.command == 'analyze'):
+        _analyze(args)
+    elif (args.command == 'assemble'):
+        return _assemble(args)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,20 +1,61 @@
+import array
+import os
+import sys
+
+INTERNAL_OFFSET = 0
 INTERNAL_SIZE = 1024 * 6
 EXTERNAL_OFFSET = 1024 * 6
 EXTERNAL_SIZE = 1024 * 2
 MEM_SIZE = 1024 * 8
 
+#one dirty bit per program word, and the positions of the set bits of every byte value
+UPDATED_SIZE = MEM_SIZE // 2 // 8
+NOT_UPDATED = bytes(UPDATED_SIZE)
+SET_BITS = tuple(tuple(bit for bit in range(8) if ((value >> bit) & 0x01)) for value in range(256))
+
 class Memory():
-    def __init__(self, internalPath, externalPath):
-        self._memory = bytearray()
+    __slots__ = (
+        "_memory", "_internal", "_external", "_SA", "_updated", "_decoded",
+        "_persistent", "_externalPath", "_externalDirty"
+    )
+
+    def __init__(self, internalPath, externalPath, persistent = False):
+        #persistent keeps the external RAM like the battery-backed original, writing it back to its file on flush()
+        #one fixed buffer, the ROM and the external RAM are loaded in place through views of their regions
+        self._memory = bytearray(MEM_SIZE)
+        self._internal = memoryview(self._memory)[:INTERNAL_SIZE]
+        self._external = memoryview(self._memory)[EXTERNAL_OFFSET:]
         self._SA = 0
-        self._updated = []
+        self._updated = bytearray(UPDATED_SIZE)
+        self._decoded = [None] * (MEM_SIZE // 2)
+        self._persistent = persistent
+        self._externalPath = None
+        self._externalDirty = False
         self.setInternal(internalPath)
         self.setExternal(externalPath)
+        self._setUpdated(0, MEM_SIZE // 2 - 1)
 
     def getOpcode(self, PC):
         PC = (PC & 0xFFF) << 1
         return (self._memory[PC] << 8) | self._memory[PC + 1]
 
+    def internal(self):
+        return self._internal.toreadonly()
+
+    def external(self):
+        return self._external.toreadonly()
+
+    def image(self):
+        #read-only view of the whole program memory, big-endian words
+        return memoryview(self._memory).toreadonly()
+
+    def getOpcodes(self):
+        #every program word at once, indexed by PC
+        opcodes = array.array("H", self._memory)
+        if (sys.byteorder == "little"):
+            opcodes.byteswap()
+        return opcodes
+
     def readExternal(self):
         value = self._memory[EXTERNAL_OFFSET + self._SA]
         self._SA = (self._SA + 1) & 0x7FF
@@ -29,12 +70,18 @@ class Memory():
 
     def writeByte(self, addr, value):
         self._memory[addr] = value
-        self._updated.append(addr >> 1)
+        if (addr >= EXTERNAL_OFFSET):
+            self._externalDirty = True
+        self._updated[addr >> 4] |= 1 << ((addr >> 1) & 0x07)
+        self._decoded[addr >> 1] = None
     
     def writeWord(self, addr, value):
         self._memory[addr] = (value >> 8) & 0xFF
         self._memory[addr + 1] = value & 0xFF
-        self._updated.append(addr >> 1)
+        if (addr >= EXTERNAL_OFFSET):
+            self._externalDirty = True
+        self._updated[addr >> 4] |= 1 << ((addr >> 1) & 0x07)
+        self._decoded[addr >> 1] = None
 
     def setSA(self, value):
         self._SA = value & 0x7FF
@@ -45,36 +92,74 @@ class Memory():
     def length(self):
         return len(self._memory) // 2
    
+    def decodeCache(self):
+        #one slot per program word, filled by the CPU and cleared on every write
+        return self._decoded
+
     def getUpdated(self):
+        #every word written since the previous call, once each and in address order
         updated = self._updated
-        self._updated = []
-        return updated
+        if (updated == NOT_UPDATED):
+            return []
+        pcList = [(i << 3) + bit for i, value in enumerate(updated) if (value) for bit in SET_BITS[value]]
+        updated[:] = NOT_UPDATED
+        return pcList
+
+    def _setUpdated(self, first, last):
+        for pc in range(first, min(last, MEM_SIZE // 2 - 1) + 1):
+            self._updated[pc >> 3] |= 1 << (pc & 0x07)
 
     def setInternal(self, path):
-        rom = bytearray()
-        if (path != None):
-            try:
-                with open(path, "rb") as bin_f:
-                    rom = bytearray(bin_f.read())
-            except FileNotFoundError as e:
-                print(e.strerror, e.filename)
-        rom += bytearray([0] * (INTERNAL_SIZE - len(rom)))
-        self._memory = rom[:INTERNAL_SIZE] + self._memory[EXTERNAL_OFFSET:]
-        self._updated.extend(range(len(rom) // 2)) 
+        self._load(self._internal, INTERNAL_OFFSET, path)
 
     def setExternal(self, path):
-        mem = bytearray()
+        #swaps the external RAM under a running CPU, like plugging in another program
+        self.flush()
+        self._load(self._external, EXTERNAL_OFFSET, path)
+        self._externalPath = path
+        self._externalDirty = False
+
+    def _load(self, region, offset, path):
+        #reads the file straight into the region, only the words that differ from before count as written
+        old = bytes(region)
+        length = 0
         if (path != None):
             try:
                 with open(path, "rb") as bin_f:
-                    mem = bytearray(bin_f.read())
+                    length = bin_f.readinto(region)
             except FileNotFoundError as e:
                 print(e.strerror, e.filename)
-        mem += bytearray([0] * (EXTERNAL_SIZE - len(mem)))
-        self._memory = self._memory[:EXTERNAL_OFFSET] + mem[:EXTERNAL_SIZE]
-        self._updated.extend(range((EXTERNAL_OFFSET + len(mem)) // 2))
+        region[length:] = bytes(len(region) - length)
+
+        changed = [(offset + i) >> 1 for i in range(0, len(region), 2) if region[i] != old[i] or region[i + 1] != old[i + 1]]
+        for pc in changed:
+            self._updated[pc >> 3] |= 1 << (pc & 0x07)
+            self._decoded[pc] = None
+
+    def flush(self):
+        #in persistent mode writes the external RAM back to its file if it changed since the last flush
+        #through a temporary file renamed over the original, so a crash leaves either the old or the new contents
+        if (not (self._persistent and self._externalDirty and self._externalPath != None)):
+            return False
+        temp = self._externalPath + ".tmp"
+        try:
+            with open(temp, "wb") as bin_f:
+                bin_f.write(self._external)
+                bin_f.flush()
+                os.fsync(bin_f.fileno())
+            os.replace(temp, self._externalPath)
+        except OSError as e:
+            print(e.strerror, e.filename)
+            return False
+        self._externalDirty = False
+        return True
+
+    def snapshot(self):
+        return self._SA
 
-    def examine(self):
+    def examine(self, snapshot = None, keys = None):
+        if (snapshot == self._SA or (keys != None and "SA" not in keys)):
+            return {}
         return {
             "SA": self._SA,
         }
\ No newline at end of file
@@ -9,6 +9,13 @@ import display
 from watch import Watch
 
 class Window(QtWidgets.QMainWindow):    
+    #examine keys shown by each debug tab, the listing always needs the PC
+    TAB_EXAMINE_KEYS = {
+        "CPUTab": ["PC", "SA", "LA", "CB", "AB", "CF", "ZF", "SR", "GR"],
+        "displayTab": ["DDRAM", "DARAM", "DCTRL"],
+        "tab": ["LISTING"],
+    }
+
     def __init__(self, parent=None):
         super().__init__(parent)
         
@@ -25,10 +32,13 @@ class Window(QtWidgets.QMainWindow):
             self._face,
             self._internalMem,
             self._externalMem,
-            self.portNameCombo.currentText()
+            self.portNameCombo.currentText(),
+            self._persistent
         )
 
         self.deviceWidget.layout().addWidget(self._watchUI)       
+        self._setupWatch()
+        self.debugTabWidget.currentChanged.connect(self.debugTabCurrentChanged)
 
     def _parseArgs(self):
         parser = argparse.ArgumentParser(
@@ -38,7 +48,9 @@ class Window(QtWidgets.QMainWindow):
         parser.add_argument('-rom', nargs='?', help='Internal ROM file')
         parser.add_argument('-face', nargs='?', help='Watch face file (*.svg)')
         parser.add_argument('-bp', nargs='+', help='Breakpoints list')
+        parser.add_argument('-persist', action='store_true', help='Save external memory changes back to its file')
         args = parser.parse_args()
+        self._persistent = args.persist
         if args.ext:
             self._externalMem = args.ext
         if args.rom:
@@ -134,6 +146,10 @@ class Window(QtWidgets.QMainWindow):
         self.mcyclesLabel.setToolTip("Machine cycles from previous pause")
         self.statusBar().addPermanentWidget(self.mcyclesLabel)
 
+        self.speedLabel = QtWidgets.QLabel("x0.00")
+        self.speedLabel.setToolTip("Emulation speed, multiple of real time")
+        self.statusBar().addPermanentWidget(self.speedLabel)
+
     def closeEvent(self, event):
         self._saveSettings()
         self._watchUI.close()
@@ -239,6 +255,10 @@ class Window(QtWidgets.QMainWindow):
     def zfCheckBoxStateChanged(self, state):
         self._watchUI.editStateSignal.emit({"ZF": int(state == Qt.CheckState.Checked.value)})
 
+    @pyqtSlot(int)
+    def debugTabCurrentChanged(self, index):
+        self._subscribe()
+
     @pyqtSlot(str)
     def serialDataEditTextEdited(self, char):
         if (self.keyCodesCheckBox.checkState() == Qt.CheckState.Checked and len(char)):
@@ -338,8 +358,10 @@ class Window(QtWidgets.QMainWindow):
             "./assets/uc2000.svg", 
             "./assets/uc2000.rom", 
             None,
-            self.portNameCombo.currentText())
+            self.portNameCombo.currentText(),
+            self._persistent)
         self.deviceWidget.layout().addWidget(self._watchUI)
+        self._setupWatch()
         self._settings.setValue('watch/face', "./assets/uc2000.svg")
         self._settings.setValue('watch/internal_mem', "./assets/uc2000.rom")
         self._settings.setValue('watch/external_mem', None)
@@ -351,8 +373,10 @@ class Window(QtWidgets.QMainWindow):
             "./assets/data2000.svg", 
             "./assets/uc2000.rom", 
             None,
-            self.portNameCombo.currentText())
+            self.portNameCombo.currentText(),
+            self._persistent)
         self.deviceWidget.layout().addWidget(self._watchUI)
+        self._setupWatch()
         self._settings.setValue('watch/face', "./assets/data2000.svg")
         self._settings.setValue('watch/internal_mem', "./assets/uc2000.rom")
         self._settings.setValue('watch/external_mem', None)
@@ -364,8 +388,10 @@ class Window(QtWidgets.QMainWindow):
             "./assets/spacetronic.svg", 
             "./assets/spacetronic.rom", 
             "./assets/spacetronic.ram",
-            self.portNameCombo.currentText())
+            self.portNameCombo.currentText(),
+            self._persistent)
         self.deviceWidget.layout().addWidget(self._watchUI)
+        self._setupWatch()
         self._settings.setValue('watch/face', "./assets/spacetronic.svg")
         self._settings.setValue('watch/internal_mem', "./assets/spacetronic.rom")
         self._settings.setValue('watch/external_mem', "./assets/spacetronic.ram")
@@ -377,49 +403,66 @@ class Window(QtWidgets.QMainWindow):
             "./assets/uc3000.svg", 
             "./assets/uc3000.rom", 
             None,
-            self.portNameCombo.currentText())
+            self.portNameCombo.currentText(),
+            self._persistent)
         self.deviceWidget.layout().addWidget(self._watchUI)
+        self._setupWatch()
         self._settings.setValue('watch/face', "./assets/uc3000.svg")
         self._settings.setValue('watch/internal_mem', "./assets/uc3000.rom")
         self._settings.setValue('watch/external_mem', None)
 
+    def _setupWatch(self):
+        #breakpoints are set right away, the listing that also sets them only comes while its tab is shown
+        for pc in self._breakpoints:
+            self._watchUI.setBreakpoint(pc, True)
+        self._subscribe()
+
+    def _subscribe(self):
+        keys = {"PC"}
+        keys.update(Window.TAB_EXAMINE_KEYS.get(self.debugTabWidget.currentWidget().objectName(), []))
+        self._watchUI.subscribe(sorted(keys))
+
     @pyqtSlot(dict, bool)
     def _examine(self, info, force):
+        #info only holds what changed since the previous one, so every part is applied even while hidden
         if ("DEBUG" in info):
             self.actionDebug.setChecked(True)
 
         if (("MC" in info)):
             self.mcyclesLabel.setText("%d" % info["MC"])
 
-        if ((self.pcEdit.isVisible() or force) and ("PC" in info)):
+        if (("SPEED" in info)):
+            self.speedLabel.setText("x%.2f" % info["SPEED"]["ACHIEVED"])
+
+        if ("PC" in info):
             if (not self.pcEdit.hasFocus()):
                 self.pcEdit.setText("0x%0.3X" % info["PC"])
         
-        if ((self.asmTable.isVisible() or force) and ("PC" in info)):
+        if ("PC" in info):
             self.asmTable.selectRow(info["PC"])
 
-        if ((self.saEdit.isVisible() or force) and ("SA" in info)):
+        if ("SA" in info):
             if (not self.saEdit.hasFocus()):
                 self.saEdit.setText("0x%0.3X" % info["SA"])
 
-        if ((self.laEdit.isVisible() or force) and ("LA" in info)):
+        if ("LA" in info):
             if (not self.laEdit.hasFocus()):
                 self.laEdit.setText("0x%0.3X" % info["LA"])
 
-        if ((self.cbEdit.isVisible() or force) and ("CB" in info)):
+        if ("CB" in info):
             if (not self.cbEdit.hasFocus()):
                 self.cbEdit.setText("0x%0.1X" % info["CB"])
 
-        if ((self.abEdit.isVisible() or force) and ("AB" in info)):
+        if ("AB" in info):
             if (not self.abEdit.hasFocus()):
                 self.abEdit.setText("0x%0.1X" % info["AB"])
 
-        if ((self.cfCheckBox.isVisible() or force) and ("CF" in info)):
+        if ("CF" in info):
             self.cfCheckBox.blockSignals(True)
             self.cfCheckBox.setChecked(info["CF"])
             self.cfCheckBox.blockSignals(False)
 
-        if ((self.zfCheckBox.isVisible() or force) and ("ZF" in info)):
+        if ("ZF" in info):
             self.zfCheckBox.blockSignals(True)
             self.zfCheckBox.setChecked(info["ZF"])
             self.zfCheckBox.blockSignals(False)
@@ -432,14 +475,14 @@ class Window(QtWidgets.QMainWindow):
             self.terminalList.addItem("> 0x%0.2X" % info["ISPOUT"])
             self.terminalList.scrollToBottom()
 
-        if ((self.specRegTable.isVisible() or force) and ("SR" in info)):
+        if ("SR" in info):
             if self.specRegTable.state() != QtWidgets.QAbstractItemView.State.EditingState:
                 self.specRegTable.blockSignals(True)
                 for i, value in info["SR"].items():
                     self.specRegTable.item(0, i).setText("0x%0.1X" % value)
                 self.specRegTable.blockSignals(False)
 
-        if ((self.genRegTree.isVisible() or force) and ("GR" in info)):
+        if ("GR" in info):
             if self.genRegTree.state() != QtWidgets.QAbstractItemView.State.EditingState:
                 self.genRegTree.blockSignals(True)
                 for i, bank in info["GR"].items():
@@ -448,7 +491,7 @@ class Window(QtWidgets.QMainWindow):
                         bankTree.child(j >> 3).setText((j & 0x07) + 1, "0x%0.1X" % value)
                 self.genRegTree.blockSignals(False)
 
-        if ((self.asmTable.isVisible() or force) and ("LISTING" in info)):
+        if ("LISTING" in info):
             if self.asmTable.state() != QtWidgets.QAbstractItemView.State.EditingState:
                 self.asmTable.blockSignals(True)
                 if (self.asmTable.rowCount() <= len(info["LISTING"])):
@@ -478,14 +521,14 @@ class Window(QtWidgets.QMainWindow):
                         self.asmTable.resizeColumnsToContents() 
                 self.asmTable.blockSignals(False)          
 
-        if ((self.dispDataTable.isVisible() or force) and ("DDRAM" in info)):
+        if ("DDRAM" in info):
             if self.dispDataTable.state() != QtWidgets.QAbstractItemView.State.EditingState:
                 self.dispDataTable.blockSignals(True)
                 for i, data in info["DDRAM"].items():
                     self.dispDataTable.item(i // 10, i % 10).setText("0x%0.2X" % data)
                 self.dispDataTable.blockSignals(False)
 
-        if ((self.dispBlinkTable.isVisible() or force) and ("DARAM" in info)):
+        if ("DARAM" in info):
             if self.dispBlinkTable.state() != QtWidgets.QAbstractItemView.State.EditingState:
                 self.dispBlinkTable.blockSignals(True)
                 for i, checked in info["DARAM"].items():
@@ -493,7 +536,7 @@ class Window(QtWidgets.QMainWindow):
                     self.dispBlinkTable.item(i // 10, i % 10).setCheckState(checked)
                 self.dispBlinkTable.blockSignals(False)
 
-        if ((self.dispCtrlTable.isVisible() or force) and ("DCTRL" in info)):
+        if ("DCTRL" in info):
             if self.dispCtrlTable.state() != QtWidgets.QAbstractItemView.State.EditingState:
                 self.dispCtrlTable.blockSignals(True)
                 for i, data in info["DCTRL"].items():
@@ -515,7 +558,7 @@ class WatchUI(QtWidgets.QGraphicsView):
     
     editStateSignal = pyqtSignal(dict)
 
-    def __init__(self, examine, face, internalMem, externalMem, portName):
+    def __init__(self, examine, face, internalMem, externalMem, portName, persistent = False):
         super().__init__()
 
         self.setScene(QGraphicsScene())
@@ -528,7 +571,7 @@ class WatchUI(QtWidgets.QGraphicsView):
 
         self._draw(face)
         
-        self._watch = Watch(internalMem, externalMem, portName)
+        self._watch = Watch(internalMem, externalMem, portName, persistent)
         self._watch.uiDisplayUpdateSignal.connect(self._render)
         self._watch.examineSignal.connect(self._examineSlot)
         self.editStateSignal.connect(self._watch.editState)
@@ -572,6 +615,9 @@ class WatchUI(QtWidgets.QGraphicsView):
     def receive(self, data):
         self._watch.receive(data)
 
+    def subscribe(self, keys):
+        self._watch.subscribe(keys)
+
     def closeEvent(self, event):
         self._watchThread.requestInterruption()
         self._watchThread.quit()
@@ -611,26 +657,25 @@ class WatchUI(QtWidgets.QGraphicsView):
         self._watch.btnReleased(id)
 
     def mouseMoveEvent(self, event):
-        if (event.buttons() == QtCore.Qt.MouseButton.LeftButton):
-            item = self.scene().itemAt(self.mapToScene(event.pos()), QtGui.QTransform())
-            if isinstance(item, QtWidgets.QGraphicsRectItem):
-                item.setOpacity(1)
-        elif (event.buttons() == QtCore.Qt.MouseButton.RightButton):
-            item = self.scene().itemAt(self.mapToScene(event.pos()), QtGui.QTransform())
-            if isinstance(item, QtWidgets.QGraphicsRectItem):
-                item.setOpacity(0.02)
+        self._paintDot(event)
         return super().mouseMoveEvent(event)
 
     def mousePressEvent(self, event):
+        self._paintDot(event)
+        return super().mousePressEvent(event)
+
+    def _paintDot(self, event):
         if (event.buttons() == QtCore.Qt.MouseButton.LeftButton):
-            item = self.scene().itemAt(self.mapToScene(event.pos()), QtGui.QTransform())
-            if isinstance(item, QtWidgets.QGraphicsRectItem):
-                item.setOpacity(1)
+            alpha = 255
         elif (event.buttons() == QtCore.Qt.MouseButton.RightButton):
-            item = self.scene().itemAt(self.mapToScene(event.pos()), QtGui.QTransform())
-            if isinstance(item, QtWidgets.QGraphicsRectItem):
-                item.setOpacity(0.02)
-        return super().mousePressEvent(event)
+            alpha = 5
+        else:
+            return
+        item = self.scene().itemAt(self.mapToScene(event.pos()), QtGui.QTransform())
+        if isinstance(item, LcdItem):
+            dot = item.dotAt(item.mapFromScene(self.mapToScene(event.pos())))
+            if (dot != None):
+                item.setDotAlpha(dot, alpha)
 
     def _draw(self, faceSVG):
         self.scene().clear()
@@ -653,13 +698,24 @@ class WatchUI(QtWidgets.QGraphicsView):
             self.btnGroup.addButton(btn, id)
             id += 1
 
-        self._pixels = [0] * (display.SCR_WIDTH * display.SCR_HEIGHT)
+        self._lcd = LcdItem(
+            face.renderer().boundsOnElement("dotBounds"),
+            face.renderer().boundsOnElement("dotIndentBounds"),
+            face.renderer().boundsOnElement("charIndentBounds")
+        )
+        self.scene().addItem(self._lcd)
+        
+    @pyqtSlot(int, bytes)
+    def _render(self, firstRow, alphas):
+        self._lcd.setAlphas(firstRow, alphas)
 
-        dot = face.renderer().boundsOnElement("dotBounds")
-        dotIndent = face.renderer().boundsOnElement("dotIndentBounds")
-        charIndent = face.renderer().boundsOnElement("charIndentBounds")
-        brush = QtGui.QBrush(QtGui.QColor(0, 0, 0))
-        pen = QtGui.QPen(Qt.PenStyle.NoPen)
+class LcdItem(QtWidgets.QGraphicsItem):
+    #the whole dot matrix as one item, a repaint only redraws the dots inside the exposed rect
+    def __init__(self, dot, dotIndent, charIndent):
+        super().__init__()
+        self.setFlag(QtWidgets.QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
+
+        self._dots = []
         for i in range(display.SCR_HEIGHT * display.SCR_WIDTH):
             pY = i // display.SCR_WIDTH
             pX = i % display.SCR_WIDTH
@@ -667,10 +723,46 @@ class WatchUI(QtWidgets.QGraphicsView):
                 (pY // display.DOT_COUNT_Y) * (charIndent.height() - dotIndent.height()))
             x = (dot.x() + pX * (dot.width() + dotIndent.height()) + 
                 (pX // display.DOT_COUNT_X) * (charIndent.width() - dotIndent.width()))
-            self._pixels[i] = self.scene().addRect(x, y, dot.width(), dot.height(), pen, brush)
-            self._pixels[i].setOpacity(0)
-        
-    @pyqtSlot(list)
-    def _render(self, pixels):
-        for i, pixel in enumerate(self._pixels):
-            pixel.setOpacity(0.35 * pixels[i] + 0.65 * pixel.opacity())
+            self._dots.append(QtCore.QRectF(x, y, dot.width(), dot.height()))
+        self._rows = [
+            self._dots[y * display.SCR_WIDTH].united(self._dots[(y + 1) * display.SCR_WIDTH - 1])
+            for y in range(display.SCR_HEIGHT)
+        ]
+        self._bounds = self._rows[0].united(self._rows[-1])
+        self._alphas = bytearray(display.SCR_HEIGHT * display.SCR_WIDTH)
+        self._colors = [QtGui.QColor(0, 0, 0, alpha) for alpha in range(256)]
+
+    def boundingRect(self):
+        return self._bounds
+
+    def paint(self, painter, option, widget = None):
+        exposed = option.exposedRect
+        for y, row in enumerate(self._rows):
+            if (not row.intersects(exposed)):
+                continue
+            for i in range(y * display.SCR_WIDTH, (y + 1) * display.SCR_WIDTH):
+                alpha = self._alphas[i]
+                if (alpha):
+                    painter.fillRect(self._dots[i], self._colors[alpha])
+
+    def setAlphas(self, firstRow, alphas):
+        #alphas holds SCR_WIDTH bytes per line from firstRow on, only the lines that differ are repainted
+        for y in range(firstRow, firstRow + len(alphas) // display.SCR_WIDTH):
+            offset = y * display.SCR_WIDTH
+            start = (y - firstRow) * display.SCR_WIDTH
+            row = alphas[start:start + display.SCR_WIDTH]
+            if (self._alphas[offset:offset + display.SCR_WIDTH] != row):
+                self._alphas[offset:offset + display.SCR_WIDTH] = row
+                self.update(self._rows[y])
+
+    def setDotAlpha(self, i, alpha):
+        self._alphas[i] = alpha
+        self.update(self._dots[i])
+
+    def dotAt(self, pos):
+        for y, row in enumerate(self._rows):
+            if (row.contains(pos)):
+                for i in range(y * display.SCR_WIDTH, (y + 1) * display.SCR_WIDTH):
+                    if (self._dots[i].contains(pos)):
+                        return i
+        return None
@@ -0,0 +1,154 @@
+import argparse
+import dis
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from cpu import CPU
+from display import Display
+from memory import Memory
+from emulator2000 import NullBeeper
+
+#adi r1,1; add r2,r1; mov r3,r2; cmp r3,r1; jmp 0
+REGISTER_LOOP = (0x1022, 0x0041, 0x8062, 0x3061, 0xC000)
+
+PROGRAMS = (
+    ("UC2000.rom", "tetris.ram"),
+    ("UC2000.rom", "race.ram"),
+    ("UC2000.rom", "30cards.ram"),
+    ("UC2000.rom", "graphic.ram"),
+    ("UC2000.rom", "watchfaces.ram"),
+    ("UC2000.rom", "hit.ram"),
+    ("UC2000.rom", "shcedule.ram"),
+    ("UC2000.rom", "ram.ram"),
+    ("UC2000.rom", "empty.ram"),
+    ("spacetronic.rom", "spacetronic.ram"),
+    ("uc3000.rom", None),
+)
+
+def _machine(internalPath = None, externalPath = None):
+    memory = Memory(internalPath, externalPath)
+    display = Display()
+    return memory, display, CPU(memory, display, NullBeeper(), None)
+
+def _peakRss():
+    if (resource == None):
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if (sys.platform == "darwin") else rss
+
+def _name(rom, ram):
+    return rom if (ram == None) else rom + "+" + ram
+
+def instanceBytes():
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    machine = _machine()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+def attributeOps():
+    handlers = {handler for handler, decoder in _machine()[2]._execute if handler != None}
+    ops = 0
+    for handler in handlers:
+        ops += sum(1 for instruction in dis.get_instructions(handler) if instruction.opname in ("LOAD_ATTR", "STORE_ATTR"))
+    return ops / len(handlers)
+
+def registerLoop(instructions):
+    memory, display, cpu = _machine()
+    for addr, opcode in enumerate(REGISTER_LOOP):
+        memory.writeWord(addr * 2, opcode)
+    start = time.perf_counter()
+    for i in range(instructions):
+        cpu.clock()
+    return (time.perf_counter() - start) * 1e9 / instructions
+
+def program(rom, ram, mcycles):
+    memory, display, cpu = _machine(os.path.join(ROOT, "assets", rom), os.path.join(ROOT, "assets", ram) if (ram != None) else None)
+    start = time.perf_counter()
+    cpu.run(mcycles)
+    seconds = time.perf_counter() - start
+    return {
+        "cycles_per_s": round(mcycles / seconds),
+        "instructions_per_s": round(cpu.instructions() / seconds),
+        "instructions": cpu.instructions(),
+        "peak_rss_kb": _peakRss(),
+    }
+
+def _programProcess(queue, rom, ram, mcycles):
+    queue.put(program(rom, ram, mcycles))
+
+def suite(mcycles, programs = PROGRAMS):
+    #every program runs in a fresh interpreter so peak RSS and warm caches do not leak between them
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for rom, ram in programs:
+        queue = context.Queue()
+        process = context.Process(target = _programProcess, args = (queue, rom, ram, mcycles))
+        process.start()
+        results[_name(rom, ram)] = queue.get()
+        process.join()
+    return results
+
+def compare(report, baseline, tolerance):
+    regressions = []
+    for name, result in report["programs"].items():
+        if (name in baseline.get("programs", {})):
+            ratio = result["cycles_per_s"] / baseline["programs"][name]["cycles_per_s"]
+            print("%-32s %10d cycles/s %+6.1f%%" % (name, result["cycles_per_s"], (ratio - 1) * 100))
+            if (ratio < 1 - tolerance):
+                regressions.append(name)
+    return regressions
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description='Emulator 2000 throughput benchmark.')
+    parser.add_argument('--cycles', type=int, default=200000, help='Machine cycles per program')
+    parser.add_argument('--program', nargs='+', help='Only run programs whose name contains one of these')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--baseline', help='Compare cycles/s against a stored JSON report')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Allowed slowdown against the baseline (fraction)')
+    args = parser.parse_args(argv)
+
+    programs = PROGRAMS
+    if (args.program):
+        programs = [p for p in PROGRAMS if any(key in _name(*p) for key in args.program)]
+
+    report = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "cycles": args.cycles,
+        "instance_bytes": instanceBytes(),
+        "attribute_ops_per_handler": round(attributeOps(), 2),
+        "register_loop_ns": round(registerLoop(args.cycles)),
+        "programs": suite(args.cycles, programs),
+    }
+
+    if (args.output):
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent = 4)
+    else:
+        print(json.dumps(report, indent = 4))
+
+    if (args.baseline):
+        with open(args.baseline, "r") as file:
+            regressions = compare(report, json.load(file), args.tolerance)
+        if (regressions):
+            print("slower than baseline:", ", ".join(regressions))
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,7 +4,7 @@ from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
 import time
 
 from cpu import CPU
-from display import Display
+from display import Display, Persistence, SCR_WIDTH, SCR_HEIGHT
 from memory import Memory
 from disassembler import Disassembler
 from beeper import Beeper
@@ -19,6 +19,12 @@ MCICLE_TIME_NS = CICLE_TIME_NS * 8
 DISPLAY_UPDTE_NS = 1000000000 / FPS
 EXAMINE_UPDTE_NS = 1000000000 / EXAMINE_RATE
 
+TURBO_QUANTUM = 8192
+SLICE_NS = 2000000
+MAX_CATCHUP_NS = 100000000
+SPEED_WINDOW_NS = 500000000
+SAVE_NS = 5000000000
+
 class Watch(QObject):
     btnPressSignal = pyqtSignal(int)
     btnReleaseSignal = pyqtSignal(int)
@@ -30,21 +36,26 @@ class Watch(QObject):
     receiveSignal = pyqtSignal(int)
     setBreakpointSignal = pyqtSignal(int, bool)
     examineSignal = pyqtSignal(dict, bool)
-    uiDisplayUpdateSignal = pyqtSignal(list)
+    uiDisplayUpdateSignal = pyqtSignal(int, bytes)
     setInternalMemSignal = pyqtSignal(str)
     setExternalMemSignal = pyqtSignal(str)
     setPortNameSignal = pyqtSignal(str)
+    subscribeSignal = pyqtSignal(list)
 
-    def __init__(self, internalMem, externalMem, portName):
+    def __init__(self, internalMem, externalMem, portName, persistent = False):
         super().__init__()
         self._internalMem = internalMem
         self._externalMem = externalMem
         self._portName = portName
+        self._persistent = persistent
+        #None gathers every examine key, connected here so a subscription made before the thread runs is kept
+        self._examineKeys = None
+        self.subscribeSignal.connect(self._subscribe)
 
     @pyqtSlot()
     def run(self):
         self._beeper = Beeper()
-        self._memory = Memory(self._internalMem, self._externalMem)
+        self._memory = Memory(self._internalMem, self._externalMem, self._persistent)
         self._display = Display()
         self._disassembler = Disassembler()
         self._CPU = CPU(self._memory, self._display, self._beeper, self._transmit)
@@ -63,6 +74,17 @@ class Watch(QObject):
 
         self._mcyclesOnStop = 0
 
+        self._speedStart = time.perf_counter_ns()
+        self._speedCycles = 0
+        self._achievedSpeed = 0
+
+        self._examined = (None, None, None)
+
+        self._persistence = Persistence()
+        self._alphas = bytes(SCR_WIDTH * SCR_HEIGHT)
+        self._frameMcycles = 0
+        self._frameKey = None
+
         self.btnPressSignal.connect(self._btnPressed)
         self.btnReleaseSignal.connect(self._btnReleased)
         self.setBreakpointSignal.connect(self._setBreakpoint)
@@ -77,7 +99,7 @@ class Watch(QObject):
         self.setSpeedSignal.connect(self._setSpeed)
         self.receiveSignal.connect(self._receive)
 
-        self._uiDisplayUpdate()
+        self._uiDisplayUpdate(force = True)
         self._uiExamineUpdate(force = True)
 
         self._clock()
@@ -96,8 +118,10 @@ class Watch(QObject):
         self.setPortNameSignal.disconnect()
         self.setSpeedSignal.disconnect()
         self.receiveSignal.disconnect()
+        self.subscribeSignal.disconnect()
         self._serial.close()
         self._beeper.stop()
+        self._memory.flush()
 
     @pyqtSlot(dict)
     def editState(self, state):
@@ -134,33 +158,69 @@ class Watch(QObject):
         if ("MEMORY" in state):
             self._memory.writeWord(state["MEMORY"][0], state["MEMORY"][1])
         
-        self._uiDisplayUpdate()
+        self._uiDisplayUpdate(force = True)
         self._uiExamineUpdate(force = True)
 
     def _clock(self):
+        #runs the mcycles due in each SLICE_NS time slice, then sleeps for the rest of the slice
+        #at Max speed runs TURBO_QUANTUM batches until the next display or examine update, missed updates are skipped
         thread = self.thread().currentThread()
         lastTick = time.perf_counter_ns()
         lastExamine = lastTick
         lastDisplayUpdate = lastTick
+        lastSave = lastTick + SAVE_NS
+        self._speedStart = lastTick
+        self._speedCycles = 0
         while not(thread.isInterruptionRequested() or self._debug):
             ns = time.perf_counter_ns()
-            if (ns > lastTick):                
-                lastTick += self._mcycleTimeNs
-                self._CPU.clock()
-                self._display.clock()
-
-                if (self._CPU.PC() in self._breakpoints):
-                    self.examineSignal.emit({"DEBUG": True}, False)
-                    self._pause()
+            sliceEnd = ns + SLICE_NS
+            done = 0
+            if (self._mcycleTimeNs > 0):
+                lastTick = max(lastTick, ns - MAX_CATCHUP_NS)
+                mcycles = int((ns - lastTick) // self._mcycleTimeNs)
+                if (mcycles > 0):
+                    done = self._CPU.run(mcycles, self._breakpoints)
+                    lastTick += done * self._mcycleTimeNs
+            else:
+                deadline = max(min(lastDisplayUpdate, lastExamine), sliceEnd)
+                while (time.perf_counter_ns() < deadline and not (done and self._CPU.PC() in self._breakpoints)):
+                    done += self._CPU.run(TURBO_QUANTUM, self._breakpoints)
+                lastTick = time.perf_counter_ns()
+            self._speedCycles += done
+
+            if (done and self._CPU.PC() in self._breakpoints):
+                self.examineSignal.emit({"DEBUG": True}, False)
+                self._pause()
 
+            ns = time.perf_counter_ns()
             if (ns > lastDisplayUpdate):
-                lastDisplayUpdate += DISPLAY_UPDTE_NS
+                lastDisplayUpdate = lastDisplayUpdate + DISPLAY_UPDTE_NS if (lastDisplayUpdate + DISPLAY_UPDTE_NS > ns) else ns + DISPLAY_UPDTE_NS
                 self._uiDisplayUpdate()
             elif (ns > lastExamine):
-                lastExamine += EXAMINE_UPDTE_NS
+                lastExamine = lastExamine + EXAMINE_UPDTE_NS if (lastExamine + EXAMINE_UPDTE_NS > ns) else ns + EXAMINE_UPDTE_NS
                 self._uiExamineUpdate()
+            #checked on its own, at Max speed one of the updates above is due on every pass
+            if (ns > lastSave):
+                lastSave = ns + SAVE_NS
+                self._memory.flush()
             
             QtCore.QCoreApplication.processEvents()
+
+            if (self._mcycleTimeNs > 0):
+                remaining = sliceEnd - time.perf_counter_ns()
+                if (remaining > 0):
+                    time.sleep(remaining / 1000000000)
+
+    def _speed(self):
+        ns = time.perf_counter_ns()
+        if (ns - self._speedStart >= SPEED_WINDOW_NS):
+            self._achievedSpeed = self._speedCycles * MCICLE_TIME_NS / (ns - self._speedStart)
+            self._speedStart = ns
+            self._speedCycles = 0
+        return {
+            "ACHIEVED": self._achievedSpeed,
+            "TARGET": MCICLE_TIME_NS / self._mcycleTimeNs if (self._mcycleTimeNs > 0) else None
+        }
             
     @pyqtSlot()
     def _run(self):
@@ -170,7 +230,7 @@ class Watch(QObject):
     @pyqtSlot()
     def _pause(self):
         self._debug = True
-        self._uiDisplayUpdate()
+        self._uiDisplayUpdate(force = True)
         self._uiExamineUpdate(force = True)
         self._mcyclesOnStop = self._CPU.mcycles()
 
@@ -179,7 +239,7 @@ class Watch(QObject):
         while (self._CPU.clock() > 1):
             self._display.clock()
         self._display.clock()
-        self._uiDisplayUpdate()
+        self._uiDisplayUpdate(force = True)
         self._uiExamineUpdate(force = True)
 
     @pyqtSlot()
@@ -187,7 +247,8 @@ class Watch(QObject):
         self._debug = True
         self._display = Display()
         self._CPU = CPU(self._memory, self._display, self._beeper, self._transmit)
-        self._uiDisplayUpdate()
+        self._frameMcycles = 0
+        self._uiDisplayUpdate(force = True)
         self._uiExamineUpdate(force = True)
 
     def _transmit(self, data):
@@ -220,7 +281,6 @@ class Watch(QObject):
     @pyqtSlot(str)
     def _setExternalMem(self, path):
         self._memory.setExternal(path)
-        self._CPU = CPU(self._memory, self._display, self._beeper, self._transmit)
 
     @pyqtSlot(str)
     def _setPortName(self, name):
@@ -231,17 +291,50 @@ class Watch(QObject):
             if (not self._serial.open(QtCore.QIODeviceBase.OpenModeFlag.ReadWrite)):
                 print(self._serial.errorString())
 
-    def _uiDisplayUpdate(self):
-        self.uiDisplayUpdateSignal.emit(self._display.getPixels()) 
+    def _uiDisplayUpdate(self, force = False):
+        #dots fade by the emulated time since the last update, while paused the frame is shown settled
+        #only the span of lines whose levels changed is sent, nothing is done while the same frame stays settled
+        render = self._mcycleTimeNs == 0 and not self._debug
+        frame = self._display.render() if (render) else self._display.frame()
+        opacity = self._display.pixelOpacity()
+        key = (frame if (render) else self._display.version(), opacity, render)
+        mcycles = self._CPU.mcycles()
+        if (not force and key == self._frameKey and self._persistence.settled()):
+            self._frameMcycles = mcycles
+            return
+        self._frameKey = key
+        self._persistence.advance(frame, opacity, None if (self._debug) else mcycles - self._frameMcycles)
+        self._frameMcycles = mcycles
+
+        alphas = self._persistence.alphas()
+        rows = [y for y in range(SCR_HEIGHT) if force or
+            alphas[y * SCR_WIDTH:(y + 1) * SCR_WIDTH] != self._alphas[y * SCR_WIDTH:(y + 1) * SCR_WIDTH]]
+        self._alphas = alphas
+        if (rows):
+            first = rows[0]
+            last = rows[-1] + 1
+            self.uiDisplayUpdateSignal.emit(first, alphas[first * SCR_WIDTH:last * SCR_WIDTH])
 
     def _uiExamineUpdate(self, force = False):
+        #only the subscribed state changed since the previous update is sent, a forced update sends all of it
+        #written words stay marked in memory until a subscribed listing takes them
+        memory, cpu, display = (None, None, None) if (force) else self._examined
+        listing = self._disassembler.disassemble(self._memory) if (self._examineKeys == None or "LISTING" in self._examineKeys) else {}
         self.examineSignal.emit({
-            **self._disassembler.disassemble(self._memory),
-            **self._memory.examine(),
-            **self._CPU.examine(),
-            **self._display.examine(),
-            **{"MC": self._CPU.mcycles() - self._mcyclesOnStop}
+            **listing,
+            **self._memory.examine(memory, self._examineKeys),
+            **self._CPU.examine(cpu, self._examineKeys),
+            **self._display.examine(display, self._examineKeys),
+            **{"MC": self._CPU.mcycles() - self._mcyclesOnStop},
+            **{"SPEED": self._speed()}
         }, force)
+        self._examined = (self._memory.snapshot(), self._CPU.snapshot(), self._display.snapshot())
+
+    @pyqtSlot(list)
+    def _subscribe(self, keys):
+        #newly shown state is sent in full with the next update
+        self._examineKeys = set(keys)
+        self._examined = (None, None, None)
 
     @pyqtSlot(int)
     def _btnPressed(self, keyCode):
@@ -288,5 +381,8 @@ class Watch(QObject):
     def receive(self, data):
         self.receiveSignal.emit(data)
 
+    def subscribe(self, keys):
+        self.subscribeSignal.emit(keys)
+
     def setPortName(self, name):
         self.setPortNameSignal.emit(name)